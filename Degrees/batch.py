@@ -0,0 +1,189 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from degrees import bidirectional_shortest_path
+from landmarks import INFINITY, alt_shortest_path, load_oracle
+from names import AmbiguousName, NameNotFound, explain
+from snapshot import load_graph
+
+# Graph loaded by each worker process, and its landmark oracle if used
+graph = None
+oracle = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer many degrees-of-separation queries at once."
+    )
+    parser.add_argument("directory", help="data directory")
+    parser.add_argument("queries", nargs="?",
+                        help="JSONL or CSV file of source/target names "
+                             "(default: read JSONL from stdin)")
+    parser.add_argument("--http", type=int, metavar="PORT",
+                        help="serve queries over HTTP on localhost instead")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="report landmark bounds and search with ALT")
+    args = parser.parse_args()
+
+    with pool(args.directory, args.workers, args.landmarks) as workers:
+        if args.http is not None:
+            serve(workers, args.http)
+        elif args.queries is None:
+            run(workers, read_queries(sys.stdin, "jsonl"))
+        else:
+            fmt = "csv" if args.queries.endswith(".csv") else "jsonl"
+            with open(args.queries, encoding="utf-8", newline="") as f:
+                run(workers, read_queries(f, fmt))
+
+
+def pool(directory, workers, landmarks=False):
+    """
+    Returns a process pool whose workers share one copy of the graph.
+
+    The graph is loaded once, here. Forked workers inherit it, mapping
+    the same snapshot pages, or the same in-memory graph if the
+    snapshot could not be written. Otherwise each worker memory-maps
+    the snapshot itself, and without one it would parse the CSV files
+    again, which is reported. With `landmarks`, the landmark oracle
+    is loaded alongside the graph.
+    """
+    global graph, oracle
+    graph = load_graph(directory)
+    oracle = load_oracle(directory, graph) if landmarks else None
+    if multiprocessing.get_start_method() == "fork":
+        return multiprocessing.Pool(processes=max(1, workers))
+    if graph.snapshot is None:
+        print("No snapshot: each worker will load the CSV files.", file=sys.stderr)
+    return multiprocessing.Pool(
+        processes=max(1, workers), initializer=_init_worker, initargs=(directory, landmarks)
+    )
+
+
+def run(workers, pairs):
+    """
+    Prints one JSON answer per (source, target) pair, in input order.
+    """
+    for result in workers.imap(_answer, pairs, chunksize=16):
+        print(json.dumps(result), flush=True)
+
+
+def read_queries(lines, fmt):
+    """
+    Yields (source, target) name pairs from JSONL lines with "source"
+    and "target" keys, or from CSV rows of two columns (an optional
+    "source,target" header is skipped).
+    """
+    if fmt == "csv":
+        for row in csv.reader(lines):
+            if len(row) < 2 or row[:2] == ["source", "target"]:
+                continue
+            yield row[0], row[1]
+    else:
+        for line in lines:
+            if line.strip():
+                query = json.loads(line)
+                yield query["source"], query["target"]
+
+
+def answer(graph, source_name, target_name, oracle=None):
+    """
+    Returns a JSON-serializable answer to one query. Unknown or
+    ambiguous names are reported in an "error" field.
+
+    Given a landmark oracle, the answer also holds its "bounds" on the
+    separation (null where unbounded) and the path is found by ALT.
+    """
+    result = {"source": source_name, "target": target_name}
+    try:
+        source = resolve(graph, source_name)
+        target = resolve(graph, target_name)
+    except LookupError as e:
+        result["error"] = str(e)
+        return result
+
+    if oracle is None:
+        path = bidirectional_shortest_path(source, target, graph.neighbors)
+    else:
+        result["bounds"] = [
+            None if bound == INFINITY else bound for bound in oracle.bounds(source, target)
+        ]
+        path = alt_shortest_path(graph, oracle, source, target)
+    if path is None:
+        result["degrees"] = None
+        return result
+    result["degrees"] = len(path)
+    result["path"] = [
+        {"movie": graph.movie_titles[movie], "person": graph.person_names[person]}
+        for movie, person in path
+    ]
+    return result
+
+
+def resolve(graph, name):
+    """
+    Returns the graph index for a name or IMDB person id.
+    Raises LookupError if there is no single match.
+
+    Only an all-digit input is looked up as an id, since the first
+    id lookup builds a dict of every person id in this worker.
+    """
+    try:
+        return graph.name_index.lookup(name)
+    except AmbiguousName as e:
+        raise LookupError(explain(graph, e))
+    except NameNotFound as e:
+        if name.isdigit():
+            person = graph.person(name)
+            if person is not None:
+                return person
+        raise LookupError(explain(graph, e))
+
+
+def serve(workers, port):
+    """
+    Answers GET /?source=...&target=... requests on localhost until
+    interrupted, handing each query to the worker pool.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            if "source" not in query or "target" not in query:
+                self.send_error(400, "source and target are required")
+                return
+            pair = (query["source"][0], query["target"][0])
+            body = json.dumps(workers.apply(_answer, (pair,))).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"Serving on http://127.0.0.1:{port}/", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _init_worker(directory, landmarks):
+    global graph, oracle
+    graph = load_graph(directory)
+    oracle = load_oracle(directory, graph) if landmarks else None
+
+
+def _answer(pair):
+    return answer(graph, *pair, oracle)
+
+
+if __name__ == "__main__":
+    main()
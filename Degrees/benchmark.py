@@ -0,0 +1,246 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+# Edge counts of the default synthetic datasets
+SCALES = (10_000, 100_000, 1_000_000, 10_000_000)
+
+# Average number of stars per movie in generated data
+CAST = 5
+
+FIRST_NAMES = (
+    "Tom", "Kevin", "Emma", "Sally", "Chris", "Anna", "John", "Mary", "Lee",
+    "Ann", "Jack", "Kate", "Sam", "Julia", "Will", "Meryl", "Denzel", "Cate",
+    "Robert", "Diane", "Morgan", "Helen", "Brad", "Nicole", "Idris", "Viola"
+)
+SYLLABLES = (
+    "an", "ber", "cal", "din", "el", "fos", "gar", "hol", "in", "jor",
+    "kin", "lam", "mor", "nev", "ost", "par", "quin", "ros", "sten", "tor",
+    "ul", "van", "wes", "xan", "yor", "zel", "ham", "ley", "son", "ford"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark degrees loading, name lookup and path search "
+                    "on synthetic datasets."
+    )
+    parser.add_argument("--scales", default=",".join(str(scale) for scale in SCALES),
+                        help="comma-separated edge counts to benchmark")
+    parser.add_argument("--data", default="benchmark-data",
+                        help="directory to generate datasets into")
+    parser.add_argument("--output", help="JSONL file to append results to "
+                                         "(default: standard output)")
+    parser.add_argument("--queries", type=int, default=5,
+                        help="path queries per degree of separation")
+    parser.add_argument("--dict-limit", type=int, default=1_000_000,
+                        help="largest scale to time the dict-based load_data on")
+    parser.add_argument("--bfs-limit", type=int, default=4,
+                        help="most degrees of separation to run one-sided BFS on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for scale in [int(scale) for scale in args.scales.split(",")]:
+            directory = os.path.join(args.data, str(scale))
+            if not os.path.exists(os.path.join(directory, "stars.csv")):
+                generate(directory, scale, args.seed)
+            phases = ["build", "snapshot", "names", "paths"]
+            if scale <= args.dict_limit:
+                phases.insert(0, "load_data")
+            for phase in phases:
+                result = {"scale": scale, "phase": phase}
+                result.update(run_phase(phase, directory, args))
+                print(json.dumps(result), file=output, flush=True)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def generate(directory, edges, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv with about `edges` star
+    rows to `directory`.
+
+    Casts are drawn with a skew towards low person indices, so that, as
+    in IMDb, a few people star in many movies and most in one or two.
+    Names are drawn from small pools, so some of them are shared.
+    """
+    rng = random.Random(seed)
+    movie_count = max(1, edges // CAST)
+    person_count = max(2, edges // 3)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(person_count):
+            last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+            birth = str(rng.randint(1900, 2005)) if rng.random() < 0.8 else ""
+            writer.writerow([person + 1, f"{rng.choice(FIRST_NAMES)} {last.title()}", birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movie_count):
+            writer.writerow([movie + 1, f"Movie {movie + 1}", rng.randint(1920, 2020)])
+
+    with open(os.path.join(directory, "stars.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        written = 0
+        for movie in range(movie_count):
+            cast = {int(person_count * rng.random() ** 2) for _ in range(rng.randint(1, 2 * CAST - 1))}
+            for person in cast:
+                writer.writerow([person + 1, movie + 1])
+            written += len(cast)
+            if written >= edges:
+                break
+
+
+def run_phase(phase, directory, args):
+    """
+    Runs one benchmark phase in a child process, so that its peak RSS is
+    measured in isolation, and returns its results.
+    """
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_run_phase, args=(phase, directory, args.queries, args.bfs_limit, args.seed, child)
+    )
+    process.start()
+    # Close this end of the child's pipe, so recv fails if it dies
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        sys.exit(f"{phase} phase failed")
+    finally:
+        process.join()
+    return result
+
+
+def _run_phase(phase, directory, queries, bfs_limit, seed, connection):
+    import resource
+
+    from snapshot import SNAPSHOT, load_graph
+
+    result = {}
+    start = time.perf_counter()
+    if phase == "load_data":
+        import degrees
+        degrees.load_data(directory)
+    elif phase == "build":
+        path = os.path.join(directory, SNAPSHOT)
+        if os.path.exists(path):
+            os.remove(path)
+        graph = load_graph(directory)
+        result["people"] = graph.person_count()
+        result["movies"] = graph.movie_count()
+        result["edges"] = len(graph.person_movies)
+    elif phase == "snapshot":
+        load_graph(directory)
+    elif phase == "names":
+        result.update(time_names(load_graph(directory), queries * 20, seed))
+    else:
+        result.update(time_paths(load_graph(directory), queries, bfs_limit, seed, directory))
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    connection.send(result)
+
+
+def time_names(graph, lookups, seed):
+    """
+    Returns the mean seconds per exact, prefix and fuzzy name lookup.
+    """
+    rng = random.Random(seed)
+    index = graph.name_index
+    names = [graph.person_names[rng.randrange(graph.person_count())] for _ in range(lookups)]
+    typos = [name[:2] + name[3:] for name in names]
+    result = {}
+    for kind, lookup, keys in (
+        ("exact", index.exact, names),
+        ("prefix", index.prefix, [name[:4] for name in names]),
+        ("fuzzy", index.fuzzy, typos)
+    ):
+        start = time.perf_counter()
+        for key in keys:
+            lookup(key)
+        result[f"{kind}_seconds"] = (time.perf_counter() - start) / len(keys)
+    return result
+
+
+def time_paths(graph, queries, bfs_limit, seed, directory):
+    """
+    Times one-sided and bidirectional BFS, and ALT with the directory's
+    landmark oracle, on random pairs of people, grouped by their
+    degrees of separation.
+
+    Returns {"separations": {degrees: {algorithm: {...}}}} with the mean
+    seconds and mean nodes expanded (calls to `neighbors`) per query.
+    ALT walks the CSR arrays directly, so its "expanded" is None.
+    Loading or building the oracle is timed separately, as
+    "landmark_seconds".
+    """
+    from degrees import bidirectional_shortest_path, shortest_path
+    from landmarks import alt_shortest_path, load_oracle
+
+    start = time.perf_counter()
+    oracle = load_oracle(directory, graph)
+    landmark_seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    expanded = 0
+
+    def neighbors(person):
+        nonlocal expanded
+        expanded += 1
+        return graph.neighbors(person)
+
+    # Bucket random connected pairs by separation
+    buckets = {}
+    attempts = 0
+    while attempts < queries * 200 and (len(buckets) < 6 or min(map(len, buckets.values())) < queries):
+        attempts += 1
+        source = rng.randrange(graph.person_count())
+        target = rng.randrange(graph.person_count())
+        path = bidirectional_shortest_path(source, target, graph.neighbors)
+        if path:
+            bucket = buckets.setdefault(len(path), [])
+            if len(bucket) < queries:
+                bucket.append((source, target))
+
+    separations = {}
+    for degrees, pairs in sorted(buckets.items()):
+        algorithms = {"bidirectional": bidirectional_shortest_path}
+        if degrees <= bfs_limit:
+            algorithms["bfs"] = shortest_path
+        separations[degrees] = {}
+        for name, search in algorithms.items():
+            expanded = 0
+            start = time.perf_counter()
+            for source, target in pairs:
+                search(source, target, neighbors)
+            separations[degrees][name] = {
+                "queries": len(pairs),
+                "seconds": (time.perf_counter() - start) / len(pairs),
+                "expanded": expanded / len(pairs)
+            }
+        start = time.perf_counter()
+        for source, target in pairs:
+            alt_shortest_path(graph, oracle, source, target)
+        separations[degrees]["alt"] = {
+            "queries": len(pairs),
+            "seconds": (time.perf_counter() - start) / len(pairs),
+            "expanded": None
+        }
+    return {"landmark_seconds": landmark_seconds, "separations": separations}
+
+
+if __name__ == "__main__":
+    main()
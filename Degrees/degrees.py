@@ -1,7 +1,10 @@
-import csv
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from ingest import DanglingReport, rows
+from landmarks import INFINITY, alt_shortest_path, load_oracle
+from names import AmbiguousName, NameNotFound, choices
+from snapshot import load_graph
+from util import Node, StackFrontier, DequeQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -16,59 +19,71 @@ movies = {}
 def load_data(directory):
     """
     Load data from CSV files into memory.
+
+    Returns a DanglingReport of star rows naming an unknown person
+    or movie, which are skipped.
     """
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    for person_id, name, birth in rows(f"{directory}/people.csv", ("id", "name", "birth")):
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    for movie_id, title, year in rows(f"{directory}/movies.csv", ("id", "title", "year")):
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    report = DanglingReport()
+    for person_id, movie_id in rows(f"{directory}/stars.csv", ("person_id", "movie_id")):
+        person = people.get(person_id)
+        movie = movies.get(movie_id)
+        if person is None or movie is None:
+            report.add(person_id, movie_id, person is None, movie is None)
+            continue
+        person["movies"].add(movie_id)
+        movie["stars"].add(person_id)
+    return report
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
-    # Load data from files into memory
+    # --landmarks bounds each query and searches it with ALT
+    arguments = [argument for argument in sys.argv[1:] if argument != "--landmarks"]
+    use_landmarks = len(arguments) < len(sys.argv) - 1
+    if len(arguments) > 1:
+        sys.exit("Usage: python degrees.py [--landmarks] [directory]")
+    directory = arguments[0] if arguments else "large"
+    # Load data from the snapshot, compiling it from the CSV files if needed
     print("Loading data...")
-    load_data(directory)
+    graph = load_graph(directory)
+    oracle = load_oracle(directory, graph) if use_landmarks else None
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
+    source = person_for_name(graph, input("Name: "))
     if source is None:
         sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+    target = person_for_name(graph, input("Name: "))
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if oracle is None:
+        path = bidirectional_shortest_path(source, target, graph.neighbors)
+    else:
+        lower, upper = oracle.bounds(source, target)
+        if lower != INFINITY:
+            upper = "unknown" if upper == INFINITY else upper
+            print(f"Landmark bounds: {lower} to {upper} degrees.")
+        path = alt_shortest_path(graph, oracle, source, target)
 
     if path is None:
         print("Not connected.")
@@ -77,26 +92,31 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.person_names[path[i][1]]
+            person2 = graph.person_names[path[i + 1][1]]
+            movie = graph.movie_titles[path[i + 1][0]]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, neighbors=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `neighbors` defaults to `neighbors_for_person`; pass e.g.
+    `graph.neighbors` to search a `Graph` by dense index instead.
+
     If no possible path, returns None.
     """
+    if neighbors is None:
+        neighbors = neighbors_for_person
     people_in_front = set()
     path = []
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     source_id = source
     target_id = target
     parent = Node(state=None,parent=None,action=source_id)
-    for person in neighbors_for_person(source_id):
+    for person in neighbors(source_id):
         movie = person[0]
         id = person[1]
         person_id = id
@@ -112,7 +132,7 @@ def shortest_path(source, target):
                 path.reverse()
                 return path
             else:
-                contact = neighbors_for_person(person.state)
+                contact = neighbors(person.state)
                 for element in contact:
                     element = Node(state=element[1],parent=person,action=element[0])
                     if element.state == target_id:
@@ -130,7 +150,102 @@ def shortest_path(source, target):
 
         else:
             return None
-    
+
+
+def bidirectional_shortest_path(source, target, neighbors=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching breadth-first
+    from both ends at once.
+
+    Each step expands one whole level of whichever frontier is smaller,
+    so the search only has to reach about half the separation from
+    each side. If no possible path, returns None.
+    """
+    if neighbors is None:
+        neighbors = neighbors_for_person
+    if source == target:
+        return []
+
+    # Maps each reached person to the (movie_id, person_id) step
+    # leading back towards the side's origin
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = _expand_level(
+                forward_frontier, forward, backward, neighbors
+            )
+            if meeting is not None:
+                return _join_paths(forward, backward, *meeting)
+        else:
+            backward_frontier, meeting = _expand_level(
+                backward_frontier, backward, forward, neighbors
+            )
+            if meeting is not None:
+                person, movie_id, other = meeting
+                return _join_paths(forward, backward, other, movie_id, person)
+    return None
+
+
+def _expand_level(frontier, parents, other_parents, neighbors):
+    """
+    Expands every person in `frontier` by one hop, recording parents.
+
+    Returns the next frontier and the best (person, movie_id, neighbor)
+    edge found into `other_parents`, or None if the sides did not meet.
+    The whole level is finished before choosing, since the first meeting
+    seen is not necessarily the one on a shortest path.
+    """
+    next_frontier = []
+    meeting = None
+    best = None
+    for person_id in frontier:
+        for movie_id, neighbor_id in neighbors(person_id):
+            if neighbor_id in other_parents:
+                length = _depth(other_parents, neighbor_id)
+                if best is None or length < best:
+                    best = length
+                    meeting = (person_id, movie_id, neighbor_id)
+            if neighbor_id not in parents:
+                parents[neighbor_id] = (movie_id, person_id)
+                next_frontier.append(neighbor_id)
+    return next_frontier, meeting
+
+
+def _depth(parents, person_id):
+    """
+    Returns the number of hops from `person_id` back to its origin.
+    """
+    depth = 0
+    while parents[person_id] is not None:
+        person_id = parents[person_id][1]
+        depth += 1
+    return depth
+
+
+def _join_paths(forward, backward, person_id, movie_id, neighbor_id):
+    """
+    Rebuilds the source-to-target path through the edge where the
+    forward search (ending at `person_id`) met the backward search
+    (ending at `neighbor_id`).
+    """
+    path = []
+    while forward[person_id] is not None:
+        step_movie, previous = forward[person_id]
+        path.append((step_movie, person_id))
+        person_id = previous
+    path.reverse()
+
+    path.append((movie_id, neighbor_id))
+    while backward[neighbor_id] is not None:
+        step_movie, following = backward[neighbor_id]
+        path.append((step_movie, following))
+        neighbor_id = following
+    return path
 
 
 def person_id_for_name(name):
@@ -140,7 +255,7 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
-        return 1
+        return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
@@ -154,11 +269,34 @@ def person_id_for_name(name):
                 return person_id
         except ValueError:
             pass
-        return 2
+        return None
     else:
         return person_ids[0]
 
 
+def person_for_name(graph, name):
+    """
+    Returns the graph index for a person's name,
+    resolving ambiguities as needed, or None if there is no match.
+    """
+    try:
+        return graph.name_index.lookup(name)
+    except NameNotFound as e:
+        if e.suggestions:
+            print("Did you mean:")
+            for line in choices(graph, e):
+                print(f"    {line}")
+        return None
+    except AmbiguousName as e:
+        print(f"Which '{name}'?")
+        for line in choices(graph, e):
+            print(line)
+        person = graph.person(input("Intended Person ID: "))
+        if person in e.candidates:
+            return person
+        return None
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
@@ -0,0 +1,173 @@
+from array import array
+
+from ingest import read_tables
+from names import NameIndex
+
+
+class Graph():
+    """
+    Compact, integer-indexed form of the people/movies data.
+
+    People and movies are interned to dense ints (their row order in
+    the CSV files). The star relation is stored twice in CSR form:
+    `person_offsets`/`person_movies` list the movies of each person and
+    `movie_offsets`/`movie_people` list the stars of each movie, so the
+    movies of person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 name_index=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        self.snapshot = None
+        self.dangling = None
+        self._person_index = None
+        self._movie_index = None
+        self._name_index = name_index
+
+    @classmethod
+    def from_csv(cls, directory, processes=None):
+        """
+        Builds a graph from the people, movies and stars CSV files.
+        Star rows naming an unknown person or movie are skipped and
+        recorded in the graph's `dangling` report.
+        """
+        people, movies, star_people, star_movies, report = read_tables(
+            directory, processes
+        )
+        graph = cls.from_edges(*people, *movies, star_people, star_movies)
+        graph.dangling = report
+        return graph
+
+    @classmethod
+    def from_edges(cls, person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   star_people, star_movies):
+        """
+        Builds a graph from parallel arrays of (person, movie) star pairs,
+        dropping duplicate pairs.
+        """
+        person_offsets, person_movies = _csr(
+            len(person_ids), star_people, star_movies
+        )
+        movie_offsets, movie_people = _csr(
+            len(movie_ids), star_movies, star_people
+        )
+        return cls(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            person_offsets, person_movies, movie_offsets, movie_people
+        )
+
+    def person_count(self):
+        return len(self.person_offsets) - 1
+
+    def movie_count(self):
+        return len(self.movie_offsets) - 1
+
+    def person(self, person_id):
+        """
+        Returns the dense index of an IMDB person id, or None.
+        """
+        if self._person_index is None:
+            self._person_index = {
+                person_id: i for i, person_id in enumerate(self.person_ids)
+            }
+        return self._person_index.get(person_id)
+
+    def movie(self, movie_id):
+        """
+        Returns the dense index of an IMDB movie id, or None.
+        """
+        if self._movie_index is None:
+            self._movie_index = {
+                movie_id: i for i, movie_id in enumerate(self.movie_ids)
+            }
+        return self._movie_index.get(movie_id)
+
+    @property
+    def name_index(self):
+        """
+        The NameIndex over person names, built on first use unless
+        it was loaded with the graph.
+        """
+        if self._name_index is None:
+            self._name_index = NameIndex.build(self.person_names)
+        return self._name_index
+
+    def people_named(self, name):
+        """
+        Returns the indices of people with a given name, ignoring case.
+        """
+        return self.name_index.exact(name)
+
+    def movies_for_person(self, person):
+        """
+        Returns a zero-copy view of the movies a person starred in.
+        """
+        offsets = self.person_offsets
+        return memoryview(self.person_movies)[offsets[person]:offsets[person + 1]]
+
+    def stars_for_movie(self, movie):
+        """
+        Returns a zero-copy view of the people who starred in a movie.
+        """
+        offsets = self.movie_offsets
+        return memoryview(self.movie_people)[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred with
+        a given person, straight from the CSR arrays.
+
+        Unlike `neighbors_for_person`, no set is built: a co-star shared
+        across several movies is yielded once per movie.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_people[j]
+
+
+def _csr(rows, keys, values):
+    """
+    Groups `values` by `keys` into CSR (offsets, indices) arrays,
+    with each row's indices sorted and deduplicated.
+    """
+    counts = array("i", bytes(4 * (rows + 1)))
+    for key in keys:
+        counts[key + 1] += 1
+    for row in range(rows):
+        counts[row + 1] += counts[row]
+
+    indices = array("i", bytes(4 * len(keys)))
+    cursor = array("i", counts[:-1])
+    for key, value in zip(keys, values):
+        indices[cursor[key]] = value
+        cursor[key] += 1
+
+    # Sort and deduplicate each row, compacting in place
+    offsets = array("i", bytes(4 * (rows + 1)))
+    end = 0
+    for row in range(rows):
+        start = end
+        seen = sorted(set(indices[counts[row]:counts[row + 1]]))
+        end = start + len(seen)
+        indices[start:end] = array("i", seen)
+        offsets[row + 1] = end
+    del indices[end:]
+    return offsets, indices
@@ -0,0 +1,265 @@
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from operator import itemgetter
+
+# Approximate size of each slice of stars.csv parsed by one worker
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# How many dangling ids of each kind are kept as examples
+SAMPLES = 10
+
+# Id lookups shared with forked star-parsing workers
+_person_index = None
+_movie_index = None
+
+
+class DanglingReport():
+    """
+    Star rows that name a person or movie missing from the other files.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.people = []
+        self.movies = []
+
+    def add(self, person_id, movie_id, person_missing, movie_missing):
+        self.rows += 1
+        if person_missing and len(self.people) < SAMPLES:
+            self.people.append(person_id)
+        if movie_missing and len(self.movies) < SAMPLES:
+            self.movies.append(movie_id)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.people.extend(other.people[:SAMPLES - len(self.people)])
+        self.movies.extend(other.movies[:SAMPLES - len(self.movies)])
+
+    def __str__(self):
+        if not self.rows:
+            return "No dangling star rows."
+        lines = [f"{self.rows} star rows skipped."]
+        if self.people:
+            lines.append("Unknown person ids: " + ", ".join(self.people))
+        if self.movies:
+            lines.append("Unknown movie ids: " + ", ".join(self.movies))
+        return "\n".join(lines)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python ingest.py directory")
+    directory = sys.argv[1]
+
+    # Measure each loader in a fresh process, so peak RSS is its own
+    for name in ("baseline", "load_data", "read_tables"):
+        seconds, peak = measure(name, directory)
+        print(f"{name}: {seconds:.2f}s, peak RSS {peak / 1024:.1f} MiB")
+
+
+def rows(path, columns):
+    """
+    Yields tuples of the named columns from a CSV file, looking each
+    column up by position instead of building a dict per row.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        getter = itemgetter(*[header.index(column) for column in columns])
+        for row in reader:
+            yield getter(row)
+
+
+def read_columns(path, columns):
+    """
+    Returns one list per named column of a CSV file.
+    """
+    lists = [[] for column in columns]
+    appends = [values.append for values in lists]
+    for row in rows(path, columns):
+        for append, value in zip(appends, row):
+            append(value)
+    return lists
+
+
+def read_tables(directory, processes=None):
+    """
+    Reads the people, movies and stars CSV files of a data directory.
+
+    Returns (people, movies, star_people, star_movies, report), where
+    `people` holds the id, name and birth columns, `movies` the id,
+    title and year columns, and the star arrays hold dense row indices
+    of each valid (person, movie) pair. Rows naming unknown ids are
+    counted in the DanglingReport.
+
+    With several processes, people.csv and movies.csv are parsed side
+    by side and stars.csv in newline-aligned chunks by forked workers.
+    """
+    global _person_index, _movie_index
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if multiprocessing.get_start_method() != "fork":
+        processes = 1
+
+    people_path = os.path.join(directory, "people.csv")
+    movies_path = os.path.join(directory, "movies.csv")
+    stars_path = os.path.join(directory, "stars.csv")
+    if processes > 1:
+        with multiprocessing.Pool(2) as pool:
+            people = pool.apply_async(read_columns, (people_path, ("id", "name", "birth")))
+            movies = pool.apply_async(read_columns, (movies_path, ("id", "title", "year")))
+            people, movies = people.get(), movies.get()
+    else:
+        people = read_columns(people_path, ("id", "name", "birth"))
+        movies = read_columns(movies_path, ("id", "title", "year"))
+
+    _person_index = {person_id: i for i, person_id in enumerate(people[0])}
+    _movie_index = {movie_id: i for i, movie_id in enumerate(movies[0])}
+    try:
+        chunks = _chunks(stars_path, CHUNK_SIZE)
+        with open(stars_path, encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f))
+        columns = (header.index("person_id"), header.index("movie_id"))
+        chunks = [chunk + columns for chunk in chunks]
+        if processes > 1 and len(chunks) > 1:
+            with multiprocessing.Pool(processes) as pool:
+                parts = pool.starmap(_read_stars, chunks)
+        else:
+            parts = [_read_stars(*chunk) for chunk in chunks]
+    finally:
+        _person_index = _movie_index = None
+
+    star_people, star_movies = array("i"), array("i")
+    report = DanglingReport()
+    for part_people, part_movies, part_report in parts:
+        star_people.extend(part_people)
+        star_movies.extend(part_movies)
+        report.merge(part_report)
+    return people, movies, star_people, star_movies, report
+
+
+def measure(name, directory):
+    """
+    Runs a loader ("baseline", "load_data" or "read_tables") in a child
+    process and returns its (wall-clock seconds, peak RSS in KiB).
+    "baseline" is the original csv.DictReader loader.
+    """
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_measure, args=(name, directory, child))
+    process.start()
+    # Close this end of the child's pipe, so recv fails if it dies
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        sys.exit(f"{name} failed")
+    finally:
+        process.join()
+    return result
+
+
+def _measure(name, directory, connection):
+    import resource
+
+    start = time.perf_counter()
+    if name == "baseline":
+        _load_data_dictreader(directory)
+    elif name == "load_data":
+        import degrees
+        degrees.load_data(directory)
+    else:
+        read_tables(directory)
+    seconds = time.perf_counter() - start
+    connection.send((seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def _load_data_dictreader(directory):
+    """
+    The original degrees.load_data, kept as the baseline for main:
+    reads each CSV file with csv.DictReader and returns the names,
+    people and movies dicts it builds.
+    """
+    names, people, movies = {}, {}, {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set()
+            }
+            if row["name"].lower() not in names:
+                names[row["name"].lower()] = {row["id"]}
+            else:
+                names[row["name"].lower()].add(row["id"])
+
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            movies[row["id"]] = {
+                "title": row["title"],
+                "year": row["year"],
+                "stars": set()
+            }
+
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+    return names, people, movies
+
+
+def _chunks(path, size):
+    """
+    Splits a CSV file, after its header, into (path, start, end) byte
+    ranges of about `size` bytes that each end on a line boundary.
+    """
+    with open(path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        total = os.fstat(f.fileno()).st_size
+        chunks = []
+        while start < total:
+            f.seek(min(start + size, total))
+            f.readline()
+            end = min(f.tell(), total)
+            chunks.append((path, start, end))
+            start = end
+    return chunks
+
+
+def _read_stars(path, start, end, person_column, movie_column):
+    """
+    Parses one byte range of stars.csv into arrays of dense indices.
+    """
+    star_people, star_movies = array("i"), array("i")
+    report = DanglingReport()
+    with open(path, "rb") as f:
+        f.seek(start)
+        lines = f.read(end - start).decode("utf-8").splitlines()
+    people = _person_index
+    movies = _movie_index
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        person_id, movie_id = row[person_column], row[movie_column]
+        person = people.get(person_id)
+        movie = movies.get(movie_id)
+        if person is None or movie is None:
+            report.add(person_id, movie_id, person is None, movie is None)
+            continue
+        star_people.append(person)
+        star_movies.append(movie)
+    return star_people, star_movies, report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import heapq
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from snapshot import source_signature
+from stats import levels
+
+# Name of the landmark file written next to the CSV files
+LANDMARKS = "degrees.landmarks"
+
+MAGIC = b"DEGLMRK1"
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 255
+
+# Largest distance stored exactly; longer distances are clamped to it
+SATURATED = 254
+
+INFINITY = float("inf")
+
+
+class LandmarkOracle():
+    """
+    Degrees-of-separation bounds from precomputed landmark distances.
+
+    `distances[i][p]` is the number of hops from `landmarks[i]` to
+    person `p`. By the triangle inequality, every landmark then gives
+    a lower bound |d(L, u) - d(L, v)| and an upper bound
+    d(L, u) + d(L, v) on the distance between any two people.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        Runs a breadth-first search from each of the `k` people with
+        the most co-star links.
+        """
+        landmarks = choose_landmarks(graph, k)
+        return cls(landmarks, [distances_from(graph, person) for person in landmarks])
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the separation of two people.
+        The lower bound is infinite if they are provably not connected;
+        the upper bound is infinite if no landmark reaches both.
+        """
+        if source == target:
+            return 0, 0
+        lower, upper = 1, INFINITY
+        for distances in self.distances:
+            a, b = distances[source], distances[target]
+            if a == UNREACHABLE and b == UNREACHABLE:
+                continue
+            if a == UNREACHABLE or b == UNREACHABLE:
+                return INFINITY, INFINITY
+            lower = max(lower, abs(a - b))
+            if a < SATURATED and b < SATURATED:
+                upper = min(upper, a + b)
+        return lower, upper
+
+
+def choose_landmarks(graph, k):
+    """
+    Returns the `k` people with the most co-star links (counting a
+    co-star once per shared movie), most connected first.
+    """
+    movie_offsets = graph.movie_offsets
+    cast = [
+        movie_offsets[movie + 1] - movie_offsets[movie] - 1
+        for movie in range(graph.movie_count())
+    ]
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    degree = [
+        sum(cast[person_movies[i]]
+            for i in range(person_offsets[person], person_offsets[person + 1]))
+        for person in range(graph.person_count())
+    ]
+    return array("i", heapq.nlargest(k, range(len(degree)), key=degree.__getitem__))
+
+
+def distances_from(graph, source):
+    """
+    Returns a uint8 array of hops from `source` to every person, from
+    the breadth-first levels of stats.levels.
+    """
+    distances = array("B", bytes([UNREACHABLE]) * graph.person_count())
+    for depth, frontier in enumerate(levels(graph, [source])):
+        depth = min(depth, SATURATED)
+        for person in frontier:
+            distances[person] = depth
+    return distances
+
+
+def load_oracle(directory, graph, k=16):
+    """
+    Returns the LandmarkOracle for a data directory, memory-mapping its
+    landmark file, which is (re)built whenever it is missing or was
+    computed from other CSV files or a different `k`. If the file
+    cannot be written, the oracle is still returned from memory.
+    """
+    path = os.path.join(directory, LANDMARKS)
+    sources = source_signature(directory)
+    try:
+        return read_oracle(path, sources, k)
+    except (OSError, ValueError):
+        pass
+    oracle = LandmarkOracle.build(graph, k)
+    try:
+        write_oracle(path, oracle, sources)
+    except OSError:
+        # A read-only data directory still works, just without the file
+        pass
+    return oracle
+
+
+def write_oracle(path, oracle, sources):
+    """
+    Writes an oracle's landmarks and distance arrays to `path`.
+    """
+    header = json.dumps({
+        "sources": sources,
+        "landmarks": list(oracle.landmarks),
+        "people": len(oracle.distances[0]) if oracle.distances else 0
+    }).encode("utf-8")
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for distances in oracle.distances:
+                f.write(distances)
+        os.replace(temporary, path)
+    except BaseException:
+        # Leave no partial file behind, e.g. when the disk is full
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def read_oracle(path, sources=None, k=None):
+    """
+    Memory-maps the landmark file at `path` and returns its oracle.
+    Raises ValueError if it does not match `sources` or `k`.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+    try:
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a landmark file")
+        (length,) = struct.unpack_from("<I", view, len(MAGIC))
+        start = len(MAGIC) + 4 + length
+        header = json.loads(str(view[len(MAGIC) + 4:start], "utf-8"))
+        if sources is not None and header["sources"] != sources:
+            raise ValueError("stale landmark file")
+        landmarks = array("i", header["landmarks"])
+        if k is not None and len(landmarks) != min(k, header["people"]):
+            raise ValueError("landmark count changed")
+        people = header["people"]
+    except (KeyError, TypeError, struct.error):
+        raise ValueError("corrupt landmark file")
+    if len(view) != start + people * len(landmarks):
+        raise ValueError("truncated landmark file")
+    distances = [
+        view[start + i * people:start + (i + 1) * people]
+        for i in range(len(landmarks))
+    ]
+    return LandmarkOracle(landmarks, distances)
+
+
+def alt_shortest_path(graph, oracle, source, target):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect the source to the target, or None if there is none.
+
+    Runs A* with the landmark lower bound as its heuristic (ALT), so
+    the search heads towards the target instead of flooding outwards,
+    and gives up at once when the landmarks prove the two people lie
+    in different components.
+    """
+    if source == target:
+        return []
+    if oracle.bounds(source, target)[0] == INFINITY:
+        return None
+
+    # Only landmarks that reach the target can bound distances to it
+    references = [
+        (distances, distances[target])
+        for distances in oracle.distances
+        if distances[target] != UNREACHABLE
+    ]
+
+    def heuristic(person):
+        estimate = 0
+        for distances, to_target in references:
+            gap = abs(distances[person] - to_target)
+            if gap > estimate:
+                estimate = gap
+        return estimate
+
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    # Best known hop counts, and the (movie, person) step that reached each
+    cost = {source: 0}
+    parents = {source: None}
+    movie_cost = {}
+    heap = [(heuristic(source), 0, source)]
+    while heap:
+        estimate, hops, person = heapq.heappop(heap)
+        hops = -hops
+        if hops > cost[person]:
+            continue
+        if person == target:
+            path = []
+            while parents[person] is not None:
+                movie, previous = parents[person]
+                path.append((movie, person))
+                person = previous
+            path.reverse()
+            return path
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            if movie_cost.get(movie, INFINITY) <= hops:
+                continue
+            movie_cost[movie] = hops
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbor = movie_people[j]
+                if hops + 1 < cost.get(neighbor, INFINITY):
+                    cost[neighbor] = hops + 1
+                    parents[neighbor] = (movie, person)
+                    heapq.heappush(
+                        heap, (hops + 1 + heuristic(neighbor), -(hops + 1), neighbor)
+                    )
+    return None
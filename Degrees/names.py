@@ -0,0 +1,207 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Largest code point, used to bound prefix ranges
+LAST = chr(0x10FFFF)
+
+# Postings scanned per fuzzy lookup before candidates are ranked
+FUZZY_BUDGET = 2000
+
+# Candidates per requested match whose similarity is computed exactly
+CANDIDATES = 4
+
+
+class NameNotFound(LookupError):
+    """
+    Raised when no person has a name; carries close `suggestions`.
+    """
+
+    def __init__(self, name, suggestions):
+        super().__init__(f"'{name}' not found")
+        self.name = name
+        self.suggestions = suggestions
+
+
+class AmbiguousName(LookupError):
+    """
+    Raised when several people share a name; carries their `candidates`.
+    """
+
+    def __init__(self, name, candidates):
+        super().__init__(f"'{name}' is ambiguous")
+        self.name = name
+        self.candidates = candidates
+
+
+def choices(graph, error):
+    """
+    Returns the people a failed lookup on `graph` offers, one line
+    each: the names suggested by a NameNotFound, or the IMDB id, name
+    and birth year of each candidate of an AmbiguousName.
+    """
+    if isinstance(error, AmbiguousName):
+        return [
+            f"ID: {graph.person_ids[person]}, Name: {graph.person_names[person]}, "
+            f"Birth: {graph.person_births[person]}"
+            for person in error.candidates
+        ]
+    return [graph.person_names[person] for person in error.suggestions]
+
+
+def explain(graph, error):
+    """
+    Returns a one-line message for a failed lookup on `graph`, listing
+    its choices.
+    """
+    lines = choices(graph, error)
+    if isinstance(error, AmbiguousName):
+        return f"{error}: " + "; ".join(lines)
+    if lines:
+        return f"{error}, did you mean: " + ", ".join(lines)
+    return str(error)
+
+
+class NameIndex():
+    """
+    Case-insensitive index over person names.
+
+    `order` lists person indices sorted by lower-cased name, which
+    serves both exact and prefix lookups by binary search. Fuzzy
+    lookups use a trigram index in CSR form: `trigrams` is the sorted
+    list of trigrams and `trigram_people[trigram_offsets[t]:trigram_offsets[t + 1]]`
+    the people whose name contains trigram `t`. Trigrams are mapped to
+    their rows by a dict built on the first fuzzy lookup.
+    """
+
+    def __init__(self, names, order, trigrams, trigram_offsets, trigram_people):
+        self.names = names
+        self.order = order
+        self.trigrams = trigrams
+        self.trigram_offsets = trigram_offsets
+        self.trigram_people = trigram_people
+        self._sorted = _SortedNames(names, order)
+        self._trigram_rows = None
+
+    @classmethod
+    def build(cls, names):
+        """
+        Builds the index for a sequence of person names.
+        """
+        lowered = [name.lower() for name in names]
+        order = array("i", sorted(range(len(lowered)), key=lowered.__getitem__))
+
+        postings = {}
+        for person, name in enumerate(lowered):
+            for trigram in _trigrams(name):
+                people = postings.get(trigram)
+                if people is None:
+                    people = postings[trigram] = array("i")
+                people.append(person)
+
+        trigrams = sorted(postings)
+        trigram_offsets = array("q", [0])
+        trigram_people = array("i")
+        for trigram in trigrams:
+            trigram_people.extend(postings[trigram])
+            trigram_offsets.append(len(trigram_people))
+        return cls(names, order, trigrams, trigram_offsets, trigram_people)
+
+    def exact(self, name):
+        """
+        Returns the people with a given name, ignoring case.
+        """
+        name = name.lower()
+        start = bisect_left(self._sorted, name)
+        people = []
+        for i in range(start, len(self.order)):
+            if self._sorted[i] != name:
+                break
+            people.append(self.order[i])
+        return people
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` people whose name starts with `prefix`,
+        in alphabetical order.
+        """
+        prefix = prefix.lower()
+        start = bisect_left(self._sorted, prefix)
+        end = min(bisect_left(self._sorted, prefix + LAST), start + limit)
+        return list(self.order[start:end])
+
+    def fuzzy(self, name, limit=5):
+        """
+        Returns up to `limit` (similarity, person) pairs for the names
+        closest to `name`, best first. Similarity is the Jaccard index
+        of the two names' trigram sets.
+        """
+        query = _trigrams(name.lower())
+        if not query:
+            return []
+
+        # Count shared trigrams, reading the rarest postings first
+        if self._trigram_rows is None:
+            self._trigram_rows = {trigram: row for row, trigram in enumerate(self.trigrams)}
+        rows = []
+        for trigram in query:
+            row = self._trigram_rows.get(trigram)
+            if row is not None:
+                rows.append((self.trigram_offsets[row + 1] - self.trigram_offsets[row], row))
+        rows.sort()
+        shared = Counter()
+        scanned = 0
+        for size, row in rows:
+            if scanned and scanned + size > FUZZY_BUDGET:
+                break
+            scanned += size
+            start, end = self.trigram_offsets[row], self.trigram_offsets[row + 1]
+            shared.update(self.trigram_people[start:end])
+
+        # Rank the most promising candidates by exact similarity
+        matches = []
+        for person, count in shared.most_common(limit * CANDIDATES):
+            other = _trigrams(self.names[person].lower())
+            common = len(query & other)
+            matches.append((common / len(query | other), person))
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return matches[:limit]
+
+    def lookup(self, name):
+        """
+        Returns the single person with a given name.
+
+        Raises NameNotFound, with fuzzy suggestions, if nobody has the
+        name, and AmbiguousName if more than one person does.
+        """
+        people = self.exact(name)
+        if len(people) == 1:
+            return people[0]
+        if people:
+            raise AmbiguousName(name, people)
+        raise NameNotFound(name, [person for score, person in self.fuzzy(name)])
+
+
+class _SortedNames():
+    """
+    Sequence view of lower-cased names in index order, for bisect.
+    """
+
+    def __init__(self, names, order):
+        self.names = names
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.names[self.order[i]].lower()
+
+
+def _trigrams(name):
+    """
+    Returns the set of trigrams of a lower-cased name, padded so that
+    word boundaries count.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
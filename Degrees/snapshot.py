@@ -0,0 +1,214 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from graph import Graph
+from names import NameIndex
+
+# Name of the snapshot file written next to the CSV files
+SNAPSHOT = "degrees.snapshot"
+
+MAGIC = b"DEGSNAP1"
+VERSION = 2
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Graph attributes stored as int32 arrays
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_people")
+
+# Graph attributes stored as string tables
+STRINGS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+)
+
+
+class StringTable():
+    """
+    Read-only sequence of strings packed into one UTF-8 blob.
+    Strings are decoded on access, so loading costs nothing up front.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        offsets = self.offsets
+        blob = self.blob
+        for i in range(len(offsets) - 1):
+            yield str(blob[offsets[i]:offsets[i + 1]], "utf-8")
+
+
+def load_graph(directory):
+    """
+    Returns the Graph for a data directory, memory-mapping its snapshot.
+
+    The snapshot is rebuilt from the CSV files whenever it is missing,
+    unreadable, or was written from CSV files of a different size or
+    modification time. If it cannot be written, as in a read-only
+    directory, the graph is still returned from memory.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    sources = source_signature(directory)
+    try:
+        return read_snapshot(path, sources)
+    except (OSError, ValueError):
+        pass
+    graph = Graph.from_csv(directory)
+    try:
+        write_snapshot(path, graph, sources)
+    except OSError:
+        # A read-only data directory still loads, just without a snapshot
+        pass
+    return graph
+
+
+def source_signature(directory):
+    """
+    Returns the size and mtime of each CSV file in a data directory.
+    """
+    signature = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        signature[name] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def write_snapshot(path, graph, sources):
+    """
+    Writes `graph` to `path` as a snapshot built from `sources`.
+
+    The file is written under a temporary name and moved into place,
+    so a concurrent reader never sees a partial snapshot.
+    """
+    sections = []
+    for name in ARRAYS:
+        sections.append((name, "i", getattr(graph, name)))
+    for name in STRINGS:
+        offsets, blob = _pack_strings(getattr(graph, name))
+        sections.append((name + ".offsets", "q", offsets))
+        sections.append((name + ".blob", "B", blob))
+
+    # Store the name index too, so it is only ever built once
+    names = graph.name_index
+    offsets, blob = _pack_strings(names.trigrams)
+    sections.append(("trigrams.offsets", "q", offsets))
+    sections.append(("trigrams.blob", "B", blob))
+    sections.append(("name_order", "i", names.order))
+    sections.append(("trigram_offsets", "q", names.trigram_offsets))
+    sections.append(("trigram_people", "i", names.trigram_people))
+
+    # Lay sections out after the header, each aligned to 8 bytes
+    layout = {}
+    position = 0
+    for name, typecode, data in sections:
+        size = len(data) * data.itemsize
+        layout[name] = [position, len(data), typecode]
+        position += _padding(size)
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "sources": sources,
+        "sections": layout
+    }).encode("utf-8")
+    start = _padding(len(MAGIC) + 4 + len(header))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(bytes(start - f.tell()))
+            for name, typecode, data in sections:
+                f.write(data)
+                f.write(bytes(start + _padding(f.tell() - start) - f.tell()))
+        os.replace(temporary, path)
+    except BaseException:
+        # Leave no partial file behind, e.g. when the disk is full
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def read_snapshot(path, sources=None):
+    """
+    Memory-maps the snapshot at `path` and returns its Graph.
+
+    Raises ValueError if the file is not a snapshot of this version
+    or byte order, or, when `sources` is given, was built from
+    different CSV files.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        view = memoryview(data)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a degrees snapshot")
+        (length,) = struct.unpack_from("<I", view, len(MAGIC))
+        header = json.loads(str(view[len(MAGIC) + 4:len(MAGIC) + 4 + length], "utf-8"))
+        if header["version"] != VERSION or header["byteorder"] != sys.byteorder:
+            raise ValueError("incompatible snapshot")
+        if sources is not None and header["sources"] != sources:
+            raise ValueError("stale snapshot")
+        start = _padding(len(MAGIC) + 4 + length)
+
+        def section(name):
+            offset, count, typecode = header["sections"][name]
+            offset += start
+            size = count * array(typecode).itemsize
+            if offset + size > len(view):
+                raise ValueError("truncated snapshot")
+            return view[offset:offset + size].cast(typecode)
+
+        columns = {name: section(name) for name in ARRAYS}
+        for name in STRINGS:
+            columns[name] = StringTable(
+                section(name + ".offsets"), section(name + ".blob")
+            )
+        columns["name_index"] = NameIndex(
+            columns["person_names"],
+            section("name_order"),
+            StringTable(section("trigrams.offsets"), section("trigrams.blob")),
+            section("trigram_offsets"),
+            section("trigram_people")
+        )
+    except (KeyError, TypeError, struct.error):
+        raise ValueError("corrupt snapshot")
+    graph = Graph(**columns)
+    graph.snapshot = data
+    return graph
+
+
+def _pack_strings(strings):
+    """
+    Packs strings into an int64 offsets array and a UTF-8 byte array.
+    """
+    offsets = array("q", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, array("B", blob)
+
+
+def _padding(size):
+    """
+    Rounds a byte count up to a multiple of 8.
+    """
+    return (size + 7) & ~7
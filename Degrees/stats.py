@@ -0,0 +1,196 @@
+import argparse
+import csv
+import os
+import random
+import sys
+from array import array
+
+from names import explain
+from snapshot import load_graph
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write co-star graph statistics to a directory."
+    )
+    parser.add_argument("directory", help="data directory")
+    parser.add_argument("output", help="directory to write CSV results to")
+    parser.add_argument("--samples", type=int, default=10,
+                        help="number of people to sample eccentricity from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--person", help="name of a person to list the neighborhood of")
+    parser.add_argument("-k", type=int, default=2,
+                        help="neighborhood radius in degrees of separation")
+    args = parser.parse_args()
+
+    graph = load_graph(args.directory)
+    # Resolve the person first, so a bad name fails before any output
+    if args.person is not None:
+        try:
+            center = graph.name_index.lookup(args.person)
+        except LookupError as e:
+            sys.exit(explain(graph, e))
+    os.makedirs(args.output, exist_ok=True)
+
+    def output(name):
+        return open(os.path.join(args.output, name), "w", encoding="utf-8", newline="")
+
+    # Per-person degrees, streamed row by row, and their histogram
+    histogram = {}
+    with output("degrees.csv") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movies", "costars"])
+        for person, movies, costars in degrees(graph):
+            writer.writerow([graph.person_ids[person], movies, costars])
+            histogram[costars] = histogram.get(costars, 0) + 1
+    with output("degree_histogram.csv") as f:
+        writer = csv.writer(f)
+        writer.writerow(["costars", "people"])
+        writer.writerows(sorted(histogram.items()))
+
+    labels, sizes = components(graph)
+    with output("components.csv") as f:
+        writer = csv.writer(f)
+        writer.writerow(["component", "size"])
+        for component in sorted(range(len(sizes)), key=lambda c: -sizes[c]):
+            writer.writerow([component, sizes[component]])
+    with output("component_labels.csv") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "component"])
+        for person, component in enumerate(labels):
+            writer.writerow([graph.person_ids[person], component])
+
+    with output("eccentricity.csv") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "eccentricity", "reachable"])
+        rng = random.Random(args.seed)
+        for _ in range(min(args.samples, graph.person_count())):
+            person = rng.randrange(graph.person_count())
+            depth, reached = eccentricity(graph, person)
+            writer.writerow([graph.person_ids[person], depth, reached])
+
+    if args.person is not None:
+        with output("neighborhood.csv") as f:
+            writer = csv.writer(f)
+            writer.writerow(["person_id", "name", "degrees"])
+            for neighbor, depth in within(graph, center, args.k):
+                writer.writerow([
+                    graph.person_ids[neighbor], graph.person_names[neighbor], depth
+                ])
+
+
+def levels(graph, sources, seen_people=None, seen_movies=None):
+    """
+    Yields successive breadth-first frontiers (arrays of person indices)
+    from `sources`, starting with the sources themselves.
+
+    Each level is expanded in one pass over the CSR arrays, with people
+    and movies marked in bytearrays so that every movie's cast is read
+    at most once. Pass `seen_people`/`seen_movies` to share marks
+    between several searches.
+    """
+    if seen_people is None:
+        seen_people = bytearray(graph.person_count())
+    if seen_movies is None:
+        seen_movies = bytearray(graph.movie_count())
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    frontier = array("i", sources)
+    for person in frontier:
+        seen_people[person] = 1
+    while frontier:
+        yield frontier
+        next_frontier = array("i")
+        for person in frontier:
+            for i in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[i]
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                    neighbor = movie_people[j]
+                    if not seen_people[neighbor]:
+                        seen_people[neighbor] = 1
+                        next_frontier.append(neighbor)
+        frontier = next_frontier
+
+
+def degrees(graph):
+    """
+    Yields (person, movies, costars) for every person, where `costars`
+    counts distinct other people they starred with.
+
+    Co-stars are deduplicated by stamping a shared int array with the
+    current person instead of building a set per person.
+    """
+    stamp = array("i", [-1]) * graph.person_count()
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+    for person in range(graph.person_count()):
+        stamp[person] = person
+        costars = 0
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbor = movie_people[j]
+                if stamp[neighbor] != person:
+                    stamp[neighbor] = person
+                    costars += 1
+        yield person, person_offsets[person + 1] - person_offsets[person], costars
+
+
+def components(graph):
+    """
+    Returns (labels, sizes): the connected component of every person as
+    an int array, and the number of people in each component.
+    """
+    labels = array("i", [-1]) * graph.person_count()
+    sizes = array("i")
+    seen_people = bytearray(graph.person_count())
+    seen_movies = bytearray(graph.movie_count())
+    for person in range(graph.person_count()):
+        if seen_people[person]:
+            continue
+        component = len(sizes)
+        size = 0
+        for frontier in levels(graph, [person], seen_people, seen_movies):
+            for member in frontier:
+                labels[member] = component
+            size += len(frontier)
+        sizes.append(size)
+    return labels, sizes
+
+
+def eccentricity(graph, person):
+    """
+    Returns (eccentricity, reachable): the most degrees of separation
+    between `person` and anyone in their component, and how many people
+    that component holds.
+    """
+    depth = -1
+    reached = 0
+    for frontier in levels(graph, [person]):
+        depth += 1
+        reached += len(frontier)
+    return depth, reached
+
+
+def within(graph, person, k):
+    """
+    Yields (person, degrees) for everyone within `k` degrees of
+    `person`, nearest first, including `person` at 0 degrees.
+    """
+    for depth, frontier in enumerate(levels(graph, [person])):
+        for neighbor in frontier:
+            yield neighbor, depth
+        if depth == k:
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import random
+import sys
+import time
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Opcodes of compiled programs
+LOAD, NOT, AND, OR, IMPLIES, IFF = range(6)
+
+# Most operands of an And or Or joined in one expression; CPython's
+# compiler nests one level per operator, so wide ones take several
+# statements
+GROUP = 64
+
+
+class CompiledSentence():
+    """
+    A logical sentence compiled for fast repeated evaluation.
+
+    Symbols are numbered by their position in `symbols`, so a model is
+    a bitmask with bit i set when symbol i is true. `program` is a flat
+    list of (opcode, operands) instructions in evaluation order, where
+    instruction k writes register k and operands are registers (or, for
+    LOAD, a symbol number); the last register holds the result. Shared
+    subtrees are compiled once.
+
+    The program is turned into straight-line Python source, compiled to
+    bytecode once, and exposed two ways: `evaluate(model)` for a single
+    bitmask, and `evaluate_columns(columns, mask)` for many models at
+    once, where bit j of `columns[i]` is symbol i's value in model j.
+    """
+
+    def __init__(self, sentence, symbols=None):
+        if symbols is None:
+            symbols = sorted(sentence.symbols())
+        self.sentence = sentence
+        self.symbols = list(symbols)
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+        self.program = []
+        self._registers = {}
+        self._compile(sentence)
+        self.source = self._generate()
+        namespace = {}
+        exec(compile(self.source, "<compiled sentence>", "exec"), namespace)
+        self._evaluate = namespace["evaluate"]
+        self.evaluate_columns = namespace["evaluate_columns"]
+
+    def evaluate(self, model):
+        """
+        Evaluates the sentence in a model, given as a bitmask over
+        `symbols` or as a dict of symbol names to truth values.
+        """
+        if isinstance(model, dict):
+            model = self.bitmask(model)
+        return bool(self._evaluate(model))
+
+    def bitmask(self, model):
+        """
+        Converts a dict of symbol names to truth values into a bitmask.
+        """
+        bits = 0
+        for name, i in self.index.items():
+            try:
+                if model[name]:
+                    bits |= 1 << i
+            except KeyError:
+                raise Exception(f"variable {name} not in model")
+        return bits
+
+    def _compile(self, sentence):
+        """
+        Appends instructions computing `sentence`; returns its register.
+        """
+        key = id(sentence)
+        if key in self._registers:
+            return self._registers[key][1]
+
+        if isinstance(sentence, Symbol):
+            instruction = (LOAD, (self.index[sentence.name],))
+        elif isinstance(sentence, Not):
+            instruction = (NOT, (self._compile(sentence.operand),))
+        elif isinstance(sentence, And):
+            instruction = (AND, tuple(self._compile(c) for c in sentence.conjuncts))
+        elif isinstance(sentence, Or):
+            instruction = (OR, tuple(self._compile(d) for d in sentence.disjuncts))
+        elif isinstance(sentence, Implication):
+            instruction = (IMPLIES, (self._compile(sentence.antecedent),
+                                     self._compile(sentence.consequent)))
+        elif isinstance(sentence, Biconditional):
+            instruction = (IFF, (self._compile(sentence.left),
+                                 self._compile(sentence.right)))
+        else:
+            raise TypeError("must be a logical sentence")
+
+        register = len(self.program)
+        self.program.append(instruction)
+        # Keep the sentence alive so its id is not reused
+        self._registers[key] = (sentence, register)
+        return register
+
+    def _generate(self):
+        """
+        Returns Python source for both evaluation functions. In each,
+        `M` is the all-true value: 1 for one model, `mask` for columns.
+        """
+        functions = []
+        for header, load in (
+            ("def evaluate(m):\n    M = 1", "m >> {} & 1"),
+            ("def evaluate_columns(c, M):", "c[{}]")
+        ):
+            lines = [header]
+            for register, (opcode, operands) in enumerate(self.program):
+                names = [f"r{operand}" for operand in operands]
+                if opcode in (AND, OR):
+                    operator, empty = (" & ", "M") if opcode == AND else (" | ", "0")
+                    groups = [
+                        operator.join(names[i:i + GROUP])
+                        for i in range(0, len(names), GROUP)
+                    ] or [empty]
+                    lines.append(f"    r{register} = {groups[0]}")
+                    for group in groups[1:]:
+                        lines.append(f"    r{register} {operator.strip()}= {group}")
+                    continue
+                if opcode == LOAD:
+                    expression = load.format(operands[0])
+                elif opcode == NOT:
+                    expression = f"{names[0]} ^ M"
+                elif opcode == IMPLIES:
+                    expression = f"({names[0]} ^ M) | {names[1]}"
+                else:
+                    expression = f"{names[0]} ^ {names[1]} ^ M"
+                lines.append(f"    r{register} = {expression}")
+            lines.append(f"    return r{len(self.program) - 1}")
+            functions.append("\n".join(lines))
+        return "\n\n\n".join(functions) + "\n"
+
+
+def benchmark(sentence, models=10000, seed=0):
+    """
+    Returns the seconds taken to evaluate `sentence` in `models` random
+    models with tree-walking `evaluate` and with its compiled form.
+    """
+    compiled = CompiledSentence(sentence)
+    rng = random.Random(seed)
+    masks = [rng.getrandbits(len(compiled.symbols)) for _ in range(models)]
+    dicts = [
+        {name: bool(mask >> i & 1) for i, name in enumerate(compiled.symbols)}
+        for mask in masks
+    ]
+
+    start = time.perf_counter()
+    tree = [sentence.evaluate(model) for model in dicts]
+    tree_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    flat = [compiled.evaluate(mask) for mask in masks]
+    compiled_seconds = time.perf_counter() - start
+
+    if tree != flat:
+        raise Exception("compiled evaluation disagrees with evaluate")
+    return tree_seconds, compiled_seconds
+
+
+def wide_sentence(clauses=5000, symbols=25, seed=0):
+    """
+    Returns an And of random three-literal clauses, wider than a single
+    compiled expression can hold.
+    """
+    rng = random.Random(seed)
+    pool = [Symbol(f"S{i}") for i in range(symbols)]
+    literals = pool + [Not(symbol) for symbol in pool]
+    return And(*[Or(*rng.sample(literals, 3)) for _ in range(clauses)])
+
+
+def main():
+    import puzzle
+
+    models = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    knowledge = [(name, getattr(puzzle, name)) for name in (
+        "knowledge0", "knowledge1", "knowledge2", "knowledge3"
+    )]
+    knowledge.append(("wide", wide_sentence()))
+    for name, sentence in knowledge:
+        tree, compiled = benchmark(sentence, models)
+        print(f"{name}: evaluate {tree:.4f}s, compiled {compiled:.4f}s "
+              f"({tree / compiled:.1f}x) for {models} models")
+
+
+if __name__ == "__main__":
+    main()
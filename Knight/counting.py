@@ -0,0 +1,207 @@
+import itertools
+import sys
+
+from sat import CNF
+
+
+class ModelCounter():
+    """
+    Exact model counter (#SAT) for clauses over integer variables.
+
+    Counts by DPLL: propagate unit clauses, split the remaining clauses
+    into components that share no variables, count each component on
+    its own by branching on its most frequent variable, and multiply.
+    Component counts are cached by their clauses, so a subproblem that
+    comes back under a different path through the search is counted
+    once. Variables left in no clause double the count.
+    """
+
+    def __init__(self):
+        self.cache = {}
+
+    def count(self, clauses, variables):
+        """
+        Returns the number of assignments to `variables` (a set holding
+        every variable of `clauses`) that satisfy all the clauses.
+        """
+        result = _propagate(clauses)
+        if result is None:
+            return 0
+        clauses, units = result
+        variables = variables - {abs(unit) for unit in units}
+
+        total = 2 ** (len(variables) - len({abs(l) for c in clauses for l in c}))
+        for component in _components(clauses):
+            key = tuple(sorted(component))
+            count = self.cache.get(key)
+            if count is None:
+                count = 0
+                scope = {abs(literal) for clause in component for literal in clause}
+                variable = _branch_variable(component)
+                for literal in (variable, -variable):
+                    branch = _assign(component, literal)
+                    if branch is not None:
+                        count += self.count(branch, scope - {variable})
+                self.cache[key] = count
+            total *= count
+            if not total:
+                return 0
+        return total
+
+    def models(self, clauses, variables):
+        """
+        Yields the assignments to `variables` that satisfy the clauses,
+        one at a time, as {variable: bool}. Branches without models are
+        skipped using `count`, so every branch taken yields something.
+        """
+        result = _propagate(clauses)
+        if result is None:
+            return
+        clauses, units = result
+        assignment = {abs(unit): unit > 0 for unit in units}
+        variables = variables - assignment.keys()
+        if not clauses:
+            free = sorted(variables)
+            for values in itertools.product((False, True), repeat=len(free)):
+                model = dict(assignment)
+                model.update(zip(free, values))
+                yield model
+            return
+
+        variable = _branch_variable(clauses)
+        for literal in (variable, -variable):
+            branch = _assign(clauses, literal)
+            if branch is None or not self.count(branch, variables - {variable}):
+                continue
+            for model in self.models(branch, variables - {variable}):
+                model.update(assignment)
+                model[variable] = literal > 0
+                yield model
+
+
+def count_models(sentence, symbols=None):
+    """
+    Returns the number of models of a sentence over its symbols, plus
+    any other symbol names given in `symbols`.
+
+    The sentence is Tseitin-encoded as in sat.py. Each auxiliary
+    variable is defined as equivalent to its subformula, so models of
+    the clauses and of the sentence correspond one to one.
+    """
+    cnf, variables, names = _encode(sentence, symbols)
+    return ModelCounter().count(cnf.clauses, variables)
+
+
+def iterate_models(sentence, symbols=None):
+    """
+    Lazily yields every model of a sentence, over the same symbols as
+    count_models, as a dict of symbol names to truth values.
+    """
+    cnf, variables, names = _encode(sentence, symbols)
+    for model in ModelCounter().models(cnf.clauses, variables):
+        yield {name: model[variable] for name, variable in names.items()}
+
+
+def _encode(sentence, symbols):
+    """
+    Returns the CNF of a sentence, the set of its variables, and the
+    variables of the symbols to report, by name.
+    """
+    cnf = CNF()
+    cnf.add(sentence)
+    names = set(sentence.symbols()) | set(symbols or ())
+    for name in names:
+        cnf.variable(name)
+    cnf.clauses = [
+        clause for clause in (tuple(set(clause)) for clause in cnf.clauses)
+        if not any(-literal in clause for literal in clause)
+    ]
+    names = {name: cnf.variables[name] for name in sorted(names)}
+    return cnf, set(range(1, cnf.count + 1)), names
+
+
+def _assign(clauses, literal):
+    """
+    Returns the clauses with `literal` made true: clauses holding it are
+    dropped and its negation is removed from the others. Returns None if
+    a clause becomes empty.
+    """
+    result = []
+    for clause in clauses:
+        if literal in clause:
+            continue
+        if -literal in clause:
+            clause = tuple(other for other in clause if other != -literal)
+            if not clause:
+                return None
+        result.append(clause)
+    return result
+
+
+def _propagate(clauses):
+    """
+    Assigns the literals of unit clauses until none are left. Returns
+    (clauses, units), or None if a clause becomes empty.
+    """
+    units = []
+    while True:
+        unit = next((clause[0] for clause in clauses if len(clause) == 1), None)
+        if unit is None:
+            return clauses, units
+        clauses = _assign(clauses, unit)
+        if clauses is None:
+            return None
+        units.append(unit)
+
+
+def _components(clauses):
+    """
+    Splits clauses into groups that share no variables.
+    """
+    parents = {}
+
+    def find(variable):
+        while parents[variable] != variable:
+            parents[variable] = parents[parents[variable]]
+            variable = parents[variable]
+        return variable
+
+    for clause in clauses:
+        roots = set()
+        for literal in clause:
+            parents.setdefault(abs(literal), abs(literal))
+            roots.add(find(abs(literal)))
+        first = roots.pop()
+        for root in roots:
+            parents[root] = first
+
+    groups = {}
+    for clause in clauses:
+        groups.setdefault(find(abs(clause[0])), []).append(tuple(sorted(clause)))
+    return list(groups.values())
+
+
+def _branch_variable(clauses):
+    """
+    Returns the variable occurring in the most clauses.
+    """
+    occurrences = {}
+    for clause in clauses:
+        for literal in clause:
+            occurrences[abs(literal)] = occurrences.get(abs(literal), 0) + 1
+    return max(occurrences, key=occurrences.get)
+
+
+def main():
+    import puzzle
+
+    for name in ("knowledge0", "knowledge1", "knowledge2", "knowledge3"):
+        knowledge = getattr(puzzle, name)
+        print(f"{name}: {count_models(knowledge)} models")
+        if len(sys.argv) > 1 and sys.argv[1] == "-v":
+            for model in iterate_models(knowledge):
+                print("    " + ", ".join(symbol for symbol, value in model.items() if value))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,69 @@
 import itertools
+import weakref
 
 
 class Sentence():
 
+    # Set on nodes shared through an Interner, which are immutable and
+    # cache their hash, symbol set (a frozenset) and formula
+    _interned = False
+    _symbols = None
+    _formula = None
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
     def formula(self):
         """Returns string formula representing logical sentence."""
-        return ""
+        if self._interned:
+            return self.cached("_formula", self.formula)
+
+        # Expand sentences into their parts with an explicit stack, so
+        # the text is joined once and deep trees do not recurse
+        pieces = []
+        stack = [(self, False)]
+        while stack:
+            item = stack.pop()
+            if type(item) is str:
+                pieces.append(item)
+                continue
+            sentence, operand = item
+            # Reuse the text of interned sentences printed before, but
+            # expand the others here rather than caching each subtree
+            if not operand and sentence._formula is not None:
+                pieces.append(sentence._formula)
+            else:
+                stack.extend(reversed(sentence.parts(operand)))
+        return "".join(pieces)
+
+    def parts(self, operand=False):
+        """Returns the formula as a list of strings and (sentence,
+        operand) pairs to expand in their place. As an operand of a
+        larger formula, a sentence is parenthesized unless its formula
+        is a plain name, which gives the same text as parenthesize
+        without scanning the operand's text again."""
+        if operand:
+            return ["(", (self, False), ")"]
+        return []
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def cached(self, attribute, compute):
+        """Returns an interned sentence's cached `attribute`, computing
+        it on first use by calling `compute` with caching turned off."""
+        value = getattr(self, attribute)
+        if value is None:
+            self._interned = False
+            try:
+                value = compute()
+            finally:
+                self._interned = True
+            setattr(self, attribute, value)
+        return value
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -65,6 +114,11 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
+    def parts(self, operand=False):
+        if operand:
+            return [Sentence.parenthesize(self.name)]
+        return [self.name]
+
     def symbols(self):
         return {self.name}
 
@@ -78,6 +132,8 @@ class Not(Sentence):
         return isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
+        if self._interned:
+            return self._hash
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -86,11 +142,15 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
-    def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+    def parts(self, operand=False):
+        if operand:
+            return Sentence.parts(self, operand)
+        return ["¬", (self.operand, True)]
 
     def symbols(self):
-        return self.operand.symbols()
+        if self._interned:
+            return self._symbols
+        return set(self.operand.symbols())
 
 
 class And(Sentence):
@@ -103,6 +163,8 @@ class And(Sentence):
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
+        if self._interned:
+            return self._hash
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -114,20 +176,30 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        if self._interned:
+            raise Exception("interned sentences cannot be modified")
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
-    def formula(self):
+    def parts(self, operand=False):
         if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+            return [(self.conjuncts[0], operand)]
+        if operand and self.conjuncts:
+            return Sentence.parts(self, operand)
+        result = []
+        for conjunct in self.conjuncts:
+            if result:
+                result.append(" ∧ ")
+            result.append((conjunct, True))
+        return result
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if self._interned:
+            return self._symbols
+        return set().union(*[conjunct.symbols() for conjunct in self.conjuncts])
 
 
 class Or(Sentence):
@@ -140,6 +212,8 @@ class Or(Sentence):
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
     def __hash__(self):
+        if self._interned:
+            return self._hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -151,14 +225,22 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
-    def formula(self):
+    def parts(self, operand=False):
         if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+            return [(self.disjuncts[0], operand)]
+        if operand and self.disjuncts:
+            return Sentence.parts(self, operand)
+        result = []
+        for disjunct in self.disjuncts:
+            if result:
+                result.append(" ∨  ")
+            result.append((disjunct, True))
+        return result
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if self._interned:
+            return self._symbols
+        return set().union(*[disjunct.symbols() for disjunct in self.disjuncts])
 
 
 class Implication(Sentence):
@@ -174,6 +256,8 @@ class Implication(Sentence):
                 and self.consequent == other.consequent)
 
     def __hash__(self):
+        if self._interned:
+            return self._hash
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
@@ -183,13 +267,15 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
-    def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
-        return f"{antecedent} => {consequent}"
+    def parts(self, operand=False):
+        if operand:
+            return Sentence.parts(self, operand)
+        return [(self.antecedent, True), " => ", (self.consequent, True)]
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        if self._interned:
+            return self._symbols
+        return set().union(self.antecedent.symbols(), self.consequent.symbols())
 
 
 class Biconditional(Sentence):
@@ -205,6 +291,8 @@ class Biconditional(Sentence):
                 and self.right == other.right)
 
     def __hash__(self):
+        if self._interned:
+            return self._hash
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
@@ -216,17 +304,121 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
-    def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
+    def parts(self, operand=False):
+        if operand:
+            return Sentence.parts(self, operand)
+        return [(self.left, True), " <=> ", (self.right, True)]
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        if self._interned:
+            return self._symbols
+        return set().union(self.left.symbols(), self.right.symbols())
+
+
+class Interner():
+    """Hash-consing factory for sentences.
+
+    Structurally equal sentences made through one interner are the same
+    object, so shared subformulas are stored once. Interned nodes cache
+    their hash and symbol set, made from their operands' when the node
+    is, and on first use their formula string. The symbols() of an
+    interned node is that cached frozenset, not a copy.
+    Nodes are held weakly and are dropped once nothing else refers to
+    them.
+    """
+
+    def __init__(self):
+        self.table = weakref.WeakValueDictionary()
+
+    def make(self, kind, *operands):
+        """Returns the interned `kind(*operands)`, for operands that are
+        themselves interned (or a name, for Symbol)."""
+        if kind is Symbol:
+            key = (Symbol, operands[0])
+        else:
+            for operand in operands:
+                if not operand._interned:
+                    raise Exception("operands must be interned")
+            key = (kind,) + tuple(id(operand) for operand in operands)
+        node = self.table.get(key)
+        if node is None:
+            node = kind(*operands)
+            node._hash = hash(node)
+            if kind is Symbol:
+                node._symbols = frozenset(operands)
+            else:
+                node._symbols = frozenset().union(*[operand._symbols for operand in operands])
+            node._interned = True
+            self.table[key] = node
+        return node
+
+    def intern(self, sentence):
+        """Returns the interned equivalent of a sentence tree."""
+        done = {}
+
+        def visit(sentence):
+            key = id(sentence)
+            if key not in done:
+                if isinstance(sentence, Symbol):
+                    node = self.make(Symbol, sentence.name)
+                elif isinstance(sentence, Not):
+                    node = self.make(Not, visit(sentence.operand))
+                elif isinstance(sentence, And):
+                    node = self.make(And, *map(visit, sentence.conjuncts))
+                elif isinstance(sentence, Or):
+                    node = self.make(Or, *map(visit, sentence.disjuncts))
+                elif isinstance(sentence, Implication):
+                    node = self.make(Implication, visit(sentence.antecedent),
+                                     visit(sentence.consequent))
+                elif isinstance(sentence, Biconditional):
+                    node = self.make(Biconditional, visit(sentence.left),
+                                     visit(sentence.right))
+                else:
+                    raise TypeError("must be a logical sentence")
+                done[key] = (sentence, node)
+            return done[key][1]
+
+        return visit(sentence)
+
+
+# Interner used by intern()
+interner = Interner()
+
+
+def intern(sentence):
+    """Returns a sentence with identical subformulas shared."""
+    return interner.intern(sentence)
+
+
+def model_check(knowledge, query, method="enumerate", simplify=False):
+    """Checks if knowledge base entails query.
+
+    With method="sat", checks that knowledge ∧ ¬query is unsatisfiable
+    using the CDCL solver in sat.py instead of enumerating every model.
+    With method="compiled", enumerates models as bitmasks and evaluates
+    sentences compiled by compiler.py. With method="bitparallel", does
+    the same on blocks of 2^16 models at once using truthtable.py.
+    With method="parallel", splits those blocks into cubes checked on a
+    process pool by parallel.py, stopping at the first counter-model.
+    With simplify=True, the knowledge base is first rewritten by
+    simplify.py, which can drop redundant subformulas and symbols.
+    """
+    if simplify:
+        from simplify import simplify as rewrite
+        knowledge = rewrite(knowledge)
+    if method == "sat":
+        from sat import entails
+        return entails(knowledge, query)
+    elif method == "compiled":
+        return _model_check_compiled(knowledge, query)
+    elif method == "bitparallel":
+        from truthtable import model_check as check_blocks
+        return check_blocks(knowledge, query)
+    elif method == "parallel":
+        from parallel import model_check as check_cubes
+        return check_cubes(knowledge, query)
+    elif method != "enumerate":
+        raise ValueError(f"unknown model checking method {method!r}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -257,7 +449,65 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set().union(knowledge.symbols(), query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def model_check_many(knowledge, queries, method="enumerate", simplify=False):
+    """Checks which of several queries the knowledge base entails.
+
+    Returns a list of booleans, one per query. The work on the knowledge
+    base is shared: its models are enumerated once (method="enumerate"
+    or "bitparallel"), or one solver is kept and asked about each query
+    under assumptions (method="sat"). simplify=True is as for model_check.
+    """
+    queries = list(queries)
+    if simplify:
+        from simplify import simplify as rewrite
+        knowledge = rewrite(knowledge)
+    if method == "sat":
+        from sat import entails_many
+        return entails_many(knowledge, queries)
+    elif method == "bitparallel":
+        from truthtable import model_check_many as check_blocks
+        return check_blocks(knowledge, queries)
+    elif method != "enumerate":
+        raise ValueError(f"unknown model checking method {method!r}")
+
+    def collect(symbols, model):
+        """Collects every model of the knowledge base extending model."""
+        if not symbols:
+            if knowledge.evaluate(model):
+                models.append(model)
+        else:
+            remaining = symbols.copy()
+            p = remaining.pop()
+
+            model_true = model.copy()
+            model_true[p] = True
+            collect(remaining, model_true)
+
+            model_false = model.copy()
+            model_false[p] = False
+            collect(remaining, model_false)
+
+    # Enumerate the models of the knowledge base once, then check each query
+    symbols = set().union(knowledge.symbols(), *[query.symbols() for query in queries])
+    models = []
+    collect(symbols, dict())
+    return [all(query.evaluate(model) for model in models) for query in queries]
+
+
+def _model_check_compiled(knowledge, query):
+    """Checks entailment by running compiled sentences on every model."""
+    from compiler import CompiledSentence
+
+    symbols = sorted(set().union(knowledge.symbols(), query.symbols()))
+    knowledge = CompiledSentence(knowledge, symbols)
+    query = CompiledSentence(query, symbols)
+    for model in range(2 ** len(symbols)):
+        if knowledge.evaluate(model) and not query.evaluate(model):
+            return False
+    return True
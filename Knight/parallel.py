@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import sys
+import time
+
+from compiler import CompiledSentence
+from truthtable import BLOCK_BITS, blocks
+
+# Cubes per process, so that uneven cubes still keep every process busy
+CUBES_PER_PROCESS = 4
+
+# Per-worker state, set up once by _init_worker
+_knowledge = None
+_query = None
+_free = None
+_bits = None
+_cancelled = None
+
+
+def model_check(knowledge, query, processes=None, split=None, bits=BLOCK_BITS):
+    """
+    Checks if knowledge base entails query by enumerating every model
+    on a pool of processes.
+
+    The model space is split into 2^split cubes, one per assignment to
+    the last `split` symbols, and each cube's models are checked on
+    blocks of the truth table as in truthtable.py. As soon as any cube
+    holds a counter-model, the other workers are told to stop and the
+    pool is shut down.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    symbols = sorted(set().union(knowledge.symbols(), query.symbols()))
+    if split is None:
+        split = (processes * CUBES_PER_PROCESS - 1).bit_length()
+    split = min(split, len(symbols))
+
+    if processes == 1:
+        _init_worker(knowledge, query, symbols, split, bits, None)
+        return all(_check_cube(cube) for cube in range(1 << split))
+
+    cancelled = multiprocessing.Event()
+    with multiprocessing.Pool(
+        processes, _init_worker, (knowledge, query, symbols, split, bits, cancelled)
+    ) as pool:
+        for entailed in pool.imap_unordered(_check_cube, range(1 << split)):
+            if not entailed:
+                cancelled.set()
+                return False
+    return True
+
+
+def _init_worker(knowledge, query, symbols, split, bits, cancelled):
+    global _knowledge, _query, _free, _bits, _cancelled
+    _knowledge = CompiledSentence(knowledge, symbols)
+    _query = CompiledSentence(query, symbols)
+    _free = len(symbols) - split
+    _bits = bits
+    _cancelled = cancelled
+
+
+def _check_cube(cube):
+    """
+    Checks every model in which the last symbols are fixed to the bits
+    of `cube`. Returns False if one of them is a counter-model.
+    """
+    split = len(_knowledge.symbols) - _free
+    for block, mask in blocks(_free, _bits):
+        if _cancelled is not None and _cancelled.is_set():
+            return True
+        columns = block + [mask if cube >> i & 1 else 0 for i in range(split)]
+        if _knowledge.evaluate_columns(columns, mask) & ~_query.evaluate_columns(columns, mask):
+            return False
+    return True
+
+
+def main():
+    from logic import And, Implication, Symbol
+
+    if len(sys.argv) not in (1, 2):
+        sys.exit("Usage: python parallel.py [symbols]")
+    count = int(sys.argv[1]) if len(sys.argv) == 2 else 24
+
+    # A chain of implications over many symbols: entailed, so no cube
+    # can stop early and every model is visited
+    chain = [Symbol(f"p{i}") for i in range(count)]
+    knowledge = And(*[Implication(a, b) for a, b in zip(chain, chain[1:])])
+    query = Implication(chain[0], chain[-1])
+
+    for processes in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        entailed = model_check(knowledge, query, processes)
+        seconds = time.perf_counter() - start
+        print(f"{count} symbols, {processes} processes: {entailed} in {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import gc
+import re
+import sys
+import time
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Tokens of the formula() syntax. A parenthesized run of text without
+# operators or parentheses is one symbol name, as formula() prints
+# names that are not purely alphabetic, e.g. "(A is a Knight)".
+TOKENS = re.compile(r"""
+    (\w+)
+  | \(((?:[^()¬∧∨=<]+|=(?!>)|<(?!=>))+)\)
+  | (<=>|=>|¬|∧|∨|\(|\))
+  | (\S)
+""", re.VERBOSE)
+
+# A whole sentence that is one symbol, which formula() prints bare
+NAME = re.compile(r"(?:[^()¬∧∨=<]+|=(?!>)|<(?!=>))+")
+
+# Binding strength of binary operators; implication groups to the right
+PRECEDENCE = {"∧": 3, "∨": 2, "=>": 1, "<=>": 0}
+
+
+class Parser():
+    """
+    Parser for sentences in the syntax printed by Sentence.formula().
+
+    Operators bind, from tightest to loosest: ¬, ∧, ∨, => and <=>.
+    Implication groups to the right and biconditional to the left;
+    chains of ∧ or ∨ become a single And or Or. Symbols are shared
+    between all the sentences one parser reads, so a knowledge base
+    holds one Symbol per name.
+
+    Parsing is a single operator-precedence pass over the tokens of a
+    line, with explicit operand and operator stacks instead of one
+    recursive call per grammar rule.
+    """
+
+    def __init__(self):
+        self.symbols = {}
+
+    def symbol(self, name):
+        """Returns the shared Symbol for a name."""
+        symbol = self.symbols.get(name)
+        if symbol is None:
+            symbol = self.symbols[name] = Symbol(name)
+        return symbol
+
+    def parse(self, text):
+        """Parses one sentence. Raises ValueError on a syntax error."""
+        if NAME.fullmatch(text.strip()):
+            return self.symbol(text.strip())
+
+        symbols = self.symbols
+        operands = []
+        # Each operator is [operator, operand count]; "(" marks a group
+        operators = []
+        # Whether the next token must start an operand
+        operand = True
+        for name, quoted, token, other in TOKENS.findall(text):
+            if name or quoted:
+                if not operand:
+                    raise ValueError(f"expected an operator before {name or quoted!r}: {text}")
+                name = name or quoted
+                symbol = symbols.get(name)
+                if symbol is None:
+                    symbol = symbols[name] = Symbol(name)
+                operands.append(symbol)
+                operand = False
+            elif token == "¬" or token == "(":
+                if not operand:
+                    raise ValueError(f"expected an operator before {token!r}: {text}")
+                operators.append([token, 1])
+            elif token == ")":
+                if operand:
+                    raise ValueError(f"expected a sentence before ')': {text}")
+                while operators and operators[-1][0] != "(":
+                    self._reduce(operands, operators.pop())
+                if not operators:
+                    raise ValueError(f"unbalanced ')': {text}")
+                operators.pop()
+            elif token:
+                if operand:
+                    raise ValueError(f"expected a sentence before {token!r}: {text}")
+                precedence = PRECEDENCE[token]
+                while operators:
+                    top = operators[-1][0]
+                    if top == "(" or top != "¬" and (
+                        PRECEDENCE[top] < precedence
+                        or PRECEDENCE[top] == precedence and token == "=>"
+                    ):
+                        break
+                    if top == token and token in ("∧", "∨"):
+                        break
+                    self._reduce(operands, operators.pop())
+                if operators and operators[-1][0] == token and token in ("∧", "∨"):
+                    operators[-1][1] += 1
+                else:
+                    operators.append([token, 2])
+                operand = True
+            else:
+                raise ValueError(f"unexpected character {other!r}: {text}")
+
+        if operand:
+            raise ValueError(f"expected a sentence at the end: {text}")
+        while operators:
+            if operators[-1][0] == "(":
+                raise ValueError(f"expected ')' at the end: {text}")
+            self._reduce(operands, operators.pop())
+        return operands[0]
+
+    def parse_lines(self, lines):
+        """
+        Yields one sentence per line of an iterable of lines, such as
+        an open file, skipping blank lines and "#" comments.
+        """
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line[0] == "#":
+                continue
+            try:
+                yield self.parse(line)
+            except ValueError as error:
+                raise ValueError(f"line {number}: {error}") from None
+
+    @staticmethod
+    def _reduce(operands, operator):
+        """Replaces the operator's operands on the stack by the sentence."""
+        token, count = operator
+        if token == "¬":
+            operands.append(Not(operands.pop()))
+            return
+        arguments = operands[-count:]
+        del operands[-count:]
+        if token == "∧":
+            operands.append(And(*arguments))
+        elif token == "∨":
+            operands.append(Or(*arguments))
+        elif token == "=>":
+            operands.append(Implication(*arguments))
+        else:
+            operands.append(Biconditional(*arguments))
+
+
+def parse(text):
+    """Parses one sentence in formula() syntax."""
+    return Parser().parse(text)
+
+
+def load(path):
+    """
+    Reads a knowledge base with one sentence per line, streaming the
+    file, and returns the conjunction of its sentences.
+    """
+    # Building millions of small objects triggers the cyclic garbage
+    # collector over and over, though sentences hold no cycles
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, encoding="utf-8") as f:
+            return And(*Parser().parse_lines(f))
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def read_dimacs(lines):
+    """
+    Yields the clauses of a DIMACS CNF file, given as an iterable of
+    lines, as lists of nonzero integer literals. Comment lines and the
+    "p cnf" header are skipped; a clause may span several lines and
+    ends at its 0.
+    """
+    clause = []
+    for line in lines:
+        fields = line.split()
+        if not fields or fields[0] in ("c", "p", "%"):
+            continue
+        for literal in map(int, fields):
+            if literal:
+                clause.append(literal)
+            else:
+                yield clause
+                clause = []
+    if clause:
+        yield clause
+
+
+def dimacs_sentence(clauses):
+    """
+    Returns the conjunction of DIMACS clauses as a Sentence, naming the
+    symbol of variable v "v".
+    """
+    literals = {}
+
+    def literal(value):
+        sentence = literals.get(value)
+        if sentence is None:
+            if value > 0:
+                sentence = Symbol(str(value))
+            else:
+                sentence = Not(literal(-value))
+            literals[value] = sentence
+        return sentence
+
+    return And(*[Or(*map(literal, clause)) for clause in clauses])
+
+
+def load_dimacs(path):
+    """
+    Reads a DIMACS CNF file and returns its list of clauses, which can
+    be passed to sat.Solver directly.
+    """
+    with open(path, encoding="utf-8") as f:
+        return list(read_dimacs(f))
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python parse.py file")
+    path = sys.argv[1]
+
+    start = time.perf_counter()
+    if path.endswith(".cnf"):
+        clauses = load_dimacs(path)
+        count = f"{len(clauses)} clauses"
+    else:
+        knowledge = load(path)
+        count = f"{len(knowledge.conjuncts)} sentences"
+    print(f"{path}: {count} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
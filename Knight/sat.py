@@ -0,0 +1,533 @@
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Sentence, Symbol
+
+
+class CNF():
+    """
+    Clauses in conjunctive normal form over integer variables.
+
+    Variables are numbered from 1 and a literal is a variable or its
+    negation, so clause [1, -2] means "v1 or not v2". Symbols of the
+    encoded sentences get a variable each, recorded in `variables`;
+    the Tseitin encoding adds one more variable per And, Or,
+    Implication and Biconditional node.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.variables = {}
+        self.count = 0
+        self._encoded = {}
+        self._true = None
+
+    def variable(self, name=None):
+        """
+        Returns the variable for a symbol name, or a new auxiliary
+        variable if no name is given.
+        """
+        if name is not None and name in self.variables:
+            return self.variables[name]
+        self.count += 1
+        if name is not None:
+            self.variables[name] = self.count
+        return self.count
+
+    def true(self):
+        """
+        Returns a literal that is always true.
+        """
+        if self._true is None:
+            self._true = self.variable()
+            self.clauses.append([self._true])
+        return self._true
+
+    def add(self, sentence):
+        """
+        Adds clauses asserting that `sentence` is true.
+        Top-level conjunctions and disjunctions are added directly,
+        without auxiliary variables.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or) and sentence.disjuncts:
+            self.clauses.append([self.encode(disjunct) for disjunct in sentence.disjuncts])
+        else:
+            self.clauses.append([self.encode(sentence)])
+
+    def encode(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the Tseitin
+        clauses that define it. Each node is only encoded once.
+        """
+        key = id(sentence)
+        if key in self._encoded:
+            return self._encoded[key][1]
+
+        if isinstance(sentence, Symbol):
+            literal = self.variable(sentence.name)
+        elif isinstance(sentence, Not):
+            literal = -self.encode(sentence.operand)
+        elif isinstance(sentence, And):
+            literal = self._gate([self.encode(c) for c in sentence.conjuncts], True)
+        elif isinstance(sentence, Or):
+            literal = self._gate([self.encode(d) for d in sentence.disjuncts], False)
+        elif isinstance(sentence, Implication):
+            literal = self._gate([
+                -self.encode(sentence.antecedent), self.encode(sentence.consequent)
+            ], False)
+        elif isinstance(sentence, Biconditional):
+            left = self.encode(sentence.left)
+            right = self.encode(sentence.right)
+            literal = self.variable()
+            self.clauses.extend([
+                [-literal, -left, right], [-literal, left, -right],
+                [literal, left, right], [literal, -left, -right]
+            ])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        # Keep the sentence alive so its id is not reused
+        self._encoded[key] = (sentence, literal)
+        return literal
+
+    def _gate(self, literals, conjunction):
+        """
+        Returns a new variable defined as the conjunction (or the
+        disjunction) of `literals`.
+        """
+        if not literals:
+            return self.true() if conjunction else -self.true()
+        if len(literals) == 1:
+            return literals[0]
+        gate = self.variable()
+        sign = 1 if conjunction else -1
+        for literal in literals:
+            self.clauses.append([-sign * gate, sign * literal])
+        self.clauses.append([sign * gate] + [-sign * literal for literal in literals])
+        return gate
+
+
+class Solver():
+    """
+    CDCL SAT solver with two watched literals per clause, first-UIP
+    clause learning, activity-based branching and restarts.
+
+    Clauses can be added between calls to `solve`, and learned clauses
+    are kept, since they follow from the clauses alone. Assumptions are
+    temporary unit literals for a single call.
+    """
+
+    def __init__(self, clauses=()):
+        self.count = 0
+        self.ok = True
+        self.clauses = []
+        self.learned = []
+        self.watches = {}
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.increment = 1.0
+        self.order = []
+        self.model = None
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def ensure(self, count):
+        """
+        Makes room for variables up to `count`.
+        """
+        while self.count < count:
+            self.count += 1
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(False)
+            self.watches[self.count] = []
+            self.watches[-self.count] = []
+            heapq.heappush(self.order, (0.0, self.count))
+
+    def value(self, literal):
+        """
+        Returns 1 if `literal` is true, -1 if false, 0 if unassigned.
+        """
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause. Returns False if the clauses are now known to be
+        unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self._backtrack(0)
+        self.ensure(max((abs(literal) for literal in literals), default=0))
+
+        # Drop false and duplicate literals, skip satisfied clauses
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            if value > 0 or -literal in clause:
+                return True
+            if value == 0 and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self.clauses.append(clause)
+            self._watch(clause)
+        return self.ok
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal
+        in `assumptions` true, storing a satisfying assignment in
+        `model` as {variable: bool}.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.ensure(max((abs(literal) for literal in assumptions), default=0))
+        self._backtrack(0)
+        conflicts = 0
+        restart = 100
+        try:
+            while True:
+                conflict = self._propagate()
+                if conflict is not None:
+                    conflicts += 1
+                    if not self.limits:
+                        self.ok = False
+                        return False
+                    learned, level = self._analyze(conflict)
+                    self._backtrack(level)
+                    if len(learned) == 1:
+                        self._assign(learned[0], None)
+                    else:
+                        self.learned.append(learned)
+                        self._watch(learned)
+                        self._assign(learned[0], learned)
+                    self.increment *= 1.05
+                    continue
+
+                if conflicts >= restart:
+                    conflicts = 0
+                    restart = int(restart * 1.5)
+                    self._backtrack(0)
+                    continue
+
+                # Assume the next assumption, or else branch
+                literal = None
+                while len(self.limits) < len(assumptions):
+                    assumption = assumptions[len(self.limits)]
+                    value = self.value(assumption)
+                    if value < 0:
+                        return False
+                    self.limits.append(len(self.trail))
+                    if value == 0:
+                        literal = assumption
+                        break
+                if literal is None:
+                    variable = self._pick()
+                    if variable is None:
+                        self.model = {
+                            variable: self.values[variable] > 0
+                            for variable in range(1, self.count + 1)
+                        }
+                        return True
+                    self.limits.append(len(self.trail))
+                    literal = variable if self.phases[variable] else -variable
+                self._assign(literal, None)
+        finally:
+            self._backtrack(0)
+
+    def _watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def _assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def _propagate(self):
+        """
+        Applies unit propagation to the trail. Returns a conflicting
+        clause, or None.
+        """
+        values = self.values
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches[false]
+            kept = []
+            i = 0
+            while i < len(watching):
+                clause = watching[i]
+                i += 1
+                # Keep the false literal in the second slot
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                value = values[abs(first)]
+                if (value if first > 0 else -value) > 0:
+                    kept.append(clause)
+                    continue
+                # Look for a new literal to watch
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    value = values[abs(literal)]
+                    if (value if literal > 0 else -value) >= 0:
+                        clause[1], clause[k] = literal, false
+                        self.watches[literal].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    value = values[abs(first)]
+                    if (value if first > 0 else -value) < 0:
+                        kept.extend(watching[i:])
+                        self.watches[false] = kept
+                        return clause
+                    self._assign(first, clause)
+            self.watches[false] = kept
+        return None
+
+    def _analyze(self, conflict):
+        """
+        Derives a first-UIP clause from a conflict. Returns the clause,
+        asserting literal first, and the level to backjump to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail)
+        clause = conflict
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self._bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(other)
+            # Walk back to the next marked literal of this level
+            while True:
+                index -= 1
+                literal = self.trail[index]
+                if abs(literal) in seen:
+                    break
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal of the highest remaining level second
+        highest = max(range(1, len(learned)), key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def _bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[v], v) for v in range(1, self.count + 1)]
+            heapq.heapify(self.order)
+        else:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def _pick(self):
+        """
+        Returns the unassigned variable of highest activity, or None.
+        """
+        while self.order:
+            activity, variable = heapq.heappop(self.order)
+            if self.values[variable] == 0 and -activity == self.activity[variable]:
+                return variable
+        for variable in range(1, self.count + 1):
+            if self.values[variable] == 0:
+                return variable
+        return None
+
+    def _backtrack(self, level):
+        if len(self.limits) <= level:
+            return
+        for literal in reversed(self.trail[self.limits[level]:]):
+            variable = abs(literal)
+            self.phases[variable] = literal > 0
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that keeps one live solver for its whole lifetime.
+
+    Each added sentence is encoded into the same CNF and its new clauses
+    are fed to the same Solver, so unit-propagated literals and learned
+    clauses carry over to later queries. Entailed queries are added back
+    as facts, since adding sentences can never retract them, and the
+    counter-models found since the last addition settle later queries
+    without solving, as long as they mention only symbols those models
+    cover.
+    """
+
+    def __init__(self, *sentences):
+        self.sentences = []
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.entailed = set()
+        self.models = []
+        self._fed = 0
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.cnf.add(sentence)
+        self.models = []
+        self._feed()
+
+    def ask(self, query):
+        """Checks if the knowledge base entails query."""
+        if query in self.entailed:
+            return True
+        symbols = query.symbols()
+        for model in self.models:
+            if symbols <= model.keys() and not query.evaluate(model):
+                return False
+        literal = self.cnf.encode(query)
+        self._feed()
+        if self.solver.solve([-literal]):
+            self._keep_model()
+            return False
+        self.entailed.add(query)
+        self.solver.add_clause([literal])
+        return True
+
+    def ask_many(self, queries):
+        """Returns, for each query, whether the knowledge base entails it."""
+        return [self.ask(query) for query in queries]
+
+    def consistent(self):
+        """Returns True if the knowledge base has a model."""
+        self._feed()
+        if self.models:
+            return True
+        if self.solver.solve():
+            self._keep_model()
+            return True
+        return False
+
+    def facts(self):
+        """
+        Returns the symbols fixed by unit propagation alone, as a dict of
+        symbol names to truth values.
+        """
+        values = self.solver.values
+        return {
+            name: values[variable] > 0
+            for name, variable in self.cnf.variables.items()
+            if variable < len(values) and values[variable]
+        }
+
+    def _keep_model(self):
+        """Records the solver's model over the symbols seen so far."""
+        model = self.solver.model
+        self.models.append({
+            name: model[variable]
+            for name, variable in self.cnf.variables.items()
+            if variable in model
+        })
+
+    def _feed(self):
+        """Passes clauses the CNF gained since the last call to the solver."""
+        clauses = self.cnf.clauses
+        while self._fed < len(clauses):
+            self.solver.add_clause(clauses[self._fed])
+            self._fed += 1
+        self.solver.ensure(self.cnf.count)
+
+
+def satisfiable(sentence):
+    """
+    Returns a model of `sentence` as {symbol name: bool}, or None if
+    it is unsatisfiable.
+    """
+    cnf = CNF()
+    cnf.add(sentence)
+    solver = Solver(cnf.clauses)
+    solver.ensure(cnf.count)
+    if not solver.solve():
+        return None
+    return {name: solver.model[variable] for name, variable in cnf.variables.items()}
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, by checking that
+    knowledge ∧ ¬query is unsatisfiable.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    literal = cnf.encode(query)
+    solver = Solver(cnf.clauses)
+    return not solver.solve([-literal])
+
+
+def entails_many(knowledge, queries):
+    """
+    Returns, for each query, whether knowledge base entails it.
+
+    One solver holds the knowledge base and is asked about each query
+    under an assumption, keeping what it learned between queries. Every
+    counter-model found also settles the remaining queries it falsifies.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    literals = [cnf.encode(query) for query in queries]
+    solver = Solver(cnf.clauses)
+    solver.ensure(cnf.count)
+    results = [None] * len(literals)
+    for i, literal in enumerate(literals):
+        if results[i] is not None:
+            continue
+        if not solver.solve([-literal]):
+            results[i] = True
+            continue
+        results[i] = False
+        model = solver.model
+        for j in range(i + 1, len(literals)):
+            if results[j] is None and model[abs(literals[j])] != (literals[j] > 0):
+                results[j] = False
+    return results
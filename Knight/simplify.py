@@ -0,0 +1,154 @@
+import sys
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+def is_true(sentence):
+    """
+    Checks if a sentence is the constant TRUE, which is written as the
+    empty conjunction And().
+    """
+    return isinstance(sentence, And) and not sentence.conjuncts
+
+
+def is_false(sentence):
+    """
+    Checks if a sentence is the constant FALSE, which is written as the
+    empty disjunction Or().
+    """
+    return isinstance(sentence, Or) and not sentence.disjuncts
+
+
+def size(sentence):
+    """Returns the number of nodes in a sentence tree."""
+    if isinstance(sentence, Symbol):
+        return 1
+    elif isinstance(sentence, Not):
+        return 1 + size(sentence.operand)
+    elif isinstance(sentence, And):
+        return 1 + sum(size(conjunct) for conjunct in sentence.conjuncts)
+    elif isinstance(sentence, Or):
+        return 1 + sum(size(disjunct) for disjunct in sentence.disjuncts)
+    elif isinstance(sentence, Implication):
+        return 1 + size(sentence.antecedent) + size(sentence.consequent)
+    elif isinstance(sentence, Biconditional):
+        return 1 + size(sentence.left) + size(sentence.right)
+    raise TypeError("must be a logical sentence")
+
+
+def simplify(sentence):
+    """
+    Returns a simpler sentence equivalent to `sentence`.
+
+    Rewrites bottom-up: folds the constants TRUE and FALSE, removes
+    double negations, flattens nested And and Or, drops duplicate
+    operands, and turns a conjunction (disjunction) holding both an
+    operand and its negation into FALSE (TRUE). Implications and
+    biconditionals that fold to a constant this way are replaced by it.
+    A sentence that simplifies to TRUE is a tautology and one that
+    simplifies to FALSE a contradiction, though not every tautology or
+    contradiction is found by these local rules.
+    """
+    done = {}
+
+    def visit(sentence):
+        key = id(sentence)
+        if key not in done:
+            done[key] = (sentence, rewrite(sentence))
+        return done[key][1]
+
+    def rewrite(sentence):
+        if isinstance(sentence, Symbol):
+            return sentence
+        elif isinstance(sentence, Not):
+            return negate(visit(sentence.operand))
+        elif isinstance(sentence, And):
+            return join(And, [visit(c) for c in sentence.conjuncts])
+        elif isinstance(sentence, Or):
+            return join(Or, [visit(d) for d in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            antecedent = visit(sentence.antecedent)
+            consequent = visit(sentence.consequent)
+            disjunction = join(Or, [negate(antecedent), consequent])
+            if is_true(disjunction) or is_false(disjunction):
+                return disjunction
+            if is_true(antecedent):
+                return consequent
+            if is_false(consequent):
+                return negate(antecedent)
+            return Implication(antecedent, consequent)
+        elif isinstance(sentence, Biconditional):
+            left = visit(sentence.left)
+            right = visit(sentence.right)
+            if left == right:
+                return And()
+            if left == negate(right):
+                return Or()
+            for constant, other in ((left, right), (right, left)):
+                if is_true(constant):
+                    return other
+                if is_false(constant):
+                    return negate(other)
+            return Biconditional(left, right)
+        raise TypeError("must be a logical sentence")
+
+    return visit(sentence)
+
+
+def negate(sentence):
+    """Returns the negation of an already simplified sentence."""
+    if is_true(sentence):
+        return Or()
+    if is_false(sentence):
+        return And()
+    if isinstance(sentence, Not):
+        return sentence.operand
+    return Not(sentence)
+
+
+def join(kind, operands):
+    """
+    Returns And or Or (`kind`) of already simplified operands, flattened
+    and without duplicates, or a constant if the result is one.
+    """
+    conjunction = kind is And
+    flat = []
+    seen = set()
+    for operand in operands:
+        if isinstance(operand, kind):
+            children = operand.conjuncts if conjunction else operand.disjuncts
+        else:
+            children = [operand]
+        for child in children:
+            # FALSE in a conjunction, or TRUE in a disjunction, decides it
+            if is_false(child) if conjunction else is_true(child):
+                return Or() if conjunction else And()
+            if child in seen:
+                continue
+            if negate(child) in seen:
+                return Or() if conjunction else And()
+            seen.add(child)
+            flat.append(child)
+    if len(flat) == 1:
+        return flat[0]
+    return kind(*flat)
+
+
+def main():
+    import puzzle
+
+    for name in ("knowledge0", "knowledge1", "knowledge2", "knowledge3"):
+        knowledge = getattr(puzzle, name)
+        simplified = simplify(knowledge)
+        note = ""
+        if is_true(simplified):
+            note = ", tautology"
+        elif is_false(simplified):
+            note = ", contradiction"
+        print(f"{name}: {size(knowledge)} nodes -> {size(simplified)} nodes{note}")
+        if len(sys.argv) > 1 and sys.argv[1] == "-v":
+            print(f"    {simplified.formula()}")
+
+
+if __name__ == "__main__":
+    main()
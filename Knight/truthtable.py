@@ -0,0 +1,98 @@
+from compiler import CompiledSentence
+
+# Models evaluated per block are 2 ** BLOCK_BITS
+BLOCK_BITS = 16
+
+
+def columns(count, bits):
+    """
+    Returns the truth-table columns of the first `bits` of `count`
+    symbols: bit j of column i is set when bit i of j is set, for j
+    below 2 ** bits. The remaining symbols get 0 as a placeholder.
+    """
+    width = 1 << bits
+    result = []
+    for i in range(count):
+        if i >= bits:
+            result.append(0)
+            continue
+        run = 1 << i
+        column = ((1 << run) - 1) << run
+        size = run * 2
+        while size < width:
+            column |= column << size
+            size *= 2
+        result.append(column)
+    return result
+
+
+def blocks(count, bits=BLOCK_BITS):
+    """
+    Yields (columns, mask) for successive blocks of the truth table of
+    `count` symbols. Each block covers 2 ** bits models: the low `bits`
+    symbols vary inside the block, and the others are fixed per block
+    to all ones or all zeros.
+    """
+    bits = min(bits, count)
+    mask = (1 << (1 << bits)) - 1
+    block = columns(count, bits)
+    for high in range(1 << (count - bits)):
+        for i in range(bits, count):
+            block[i] = mask if high >> (i - bits) & 1 else 0
+        yield block, mask
+
+
+def model_check(knowledge, query, bits=BLOCK_BITS):
+    """
+    Checks if knowledge base entails query, evaluating both on whole
+    blocks of the truth table at once with bitwise operations.
+    Stops at the first block holding a counter-model.
+    """
+    symbols = sorted(set().union(knowledge.symbols(), query.symbols()))
+    knowledge = CompiledSentence(knowledge, symbols)
+    query = CompiledSentence(query, symbols)
+    for block, mask in blocks(len(symbols), bits):
+        if knowledge.evaluate_columns(block, mask) & ~query.evaluate_columns(block, mask):
+            return False
+    return True
+
+
+def model_check_many(knowledge, queries, bits=BLOCK_BITS):
+    """
+    Returns, for each query, whether knowledge base entails it, from a
+    single pass over the truth table.
+    """
+    queries = list(queries)
+    symbols = sorted(set().union(knowledge.symbols(), *[query.symbols() for query in queries]))
+    knowledge = CompiledSentence(knowledge, symbols)
+    compiled = [CompiledSentence(query, symbols) for query in queries]
+    results = [True] * len(queries)
+    for block, mask in blocks(len(symbols), bits):
+        models = knowledge.evaluate_columns(block, mask)
+        if not models:
+            continue
+        for i, query in enumerate(compiled):
+            if results[i] and models & ~query.evaluate_columns(block, mask):
+                results[i] = False
+        if not any(results):
+            break
+    return results
+
+
+def entailed_symbols(knowledge, bits=BLOCK_BITS):
+    """
+    Returns the set of symbol names that the knowledge base entails are
+    true, from a single pass over its truth table.
+    """
+    symbols = sorted(knowledge.symbols())
+    compiled = CompiledSentence(knowledge, symbols)
+    candidates = set(range(len(symbols)))
+    for block, mask in blocks(len(symbols), bits):
+        models = compiled.evaluate_columns(block, mask)
+        if not models:
+            continue
+        # A symbol stays entailed only if it holds in every model here
+        candidates = {i for i in candidates if not models & ~block[i]}
+        if not candidates:
+            break
+    return {symbols[i] for i in candidates}
@@ -0,0 +1,251 @@
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from array import array
+
+from crawler import FILES_PER_TASK, links
+from sparse import TOLERANCE, LinkMatrix
+
+# Name of the cache file written into the corpus directory
+CACHE = "pagerank.cache"
+
+MAGIC = b"PRCACHE1"
+VERSION = 1
+
+
+class Corpus():
+    """
+    Link graph of a corpus directory, with what is needed to cache it.
+
+    `files` maps each page to [size, mtime_ns] of its file when it was
+    parsed, and `hrefs` to the sorted hrefs found on it, kept whether
+    or not they are pages of the corpus: a page added later may be the
+    target of links on files that have not changed. `ranks` holds the
+    last PageRank computed for the corpus, by page, or is empty.
+    `parsed` counts the files that had to be parsed for this load.
+    """
+
+    def __init__(self, directory, files, hrefs, ranks, parsed):
+        self.directory = directory
+        self.files = files
+        self.hrefs = hrefs
+        self.ranks = ranks
+        self.parsed = parsed
+
+    def matrix(self):
+        """Returns the LinkMatrix of the links between corpus pages."""
+        pages = sorted(self.files)
+        index = {page: i for i, page in enumerate(pages)}
+        targets = [
+            sorted({index[href] for href in self.hrefs[page] if href in index} - {i})
+            for i, page in enumerate(pages)
+        ]
+        return LinkMatrix.from_links(pages, targets)
+
+    def save(self):
+        """Writes the corpus back to its cache file."""
+        write_cache(os.path.join(self.directory, CACHE), self.files, self.hrefs, self.ranks)
+
+
+def load_corpus(directory, processes=None):
+    """
+    Returns the Corpus of the .html files in a directory.
+
+    Files are taken from the directory's cache when their size and
+    modification time match it; only new or changed files are parsed,
+    on a pool of processes as in crawler.crawl_edges. A missing,
+    unreadable or outdated cache is ignored. The cache is not written
+    back; see Corpus.save.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    try:
+        files, hrefs, ranks = read_cache(os.path.join(directory, CACHE))
+    except (OSError, ValueError):
+        files, hrefs, ranks = {}, {}, {}
+
+    signature = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            stat = os.stat(os.path.join(directory, name))
+            signature[name] = [stat.st_size, stat.st_mtime_ns]
+    stale = [page for page in signature if files.get(page) != signature[page]]
+    paths = [os.path.join(directory, page) for page in stale]
+
+    if processes > 1 and len(stale) > FILES_PER_TASK:
+        with multiprocessing.Pool(processes) as pool:
+            found = list(pool.imap(links, paths, FILES_PER_TASK))
+    else:
+        found = list(map(links, paths))
+
+    hrefs = {page: hrefs[page] for page in signature if page in hrefs}
+    for page, row in zip(stale, found):
+        hrefs[page] = sorted(set(row))
+    ranks = {page: rank for page, rank in ranks.items() if page in signature}
+    return Corpus(directory, signature, hrefs, ranks, len(stale))
+
+
+def cached_pagerank(directory, damping_factor, tolerance=TOLERANCE, processes=None):
+    """
+    Returns the PageRank of a corpus directory by power iteration,
+    crawling it through its cache.
+
+    Iteration is warm-started from the ranks saved by the last run,
+    which after a small edit to the corpus are already close to the
+    answer. The links and the new ranks are saved for the next run,
+    unless the cache cannot be written. Returns (ranks, corpus,
+    iterations).
+    """
+    corpus = load_corpus(directory, processes)
+    matrix = corpus.matrix()
+    corpus.ranks = matrix.pagerank(damping_factor, tolerance, start=corpus.ranks)
+    try:
+        corpus.save()
+    except OSError:
+        pass
+    return corpus.ranks, corpus, matrix.iterations
+
+
+def write_cache(path, files, hrefs, ranks):
+    """
+    Writes a corpus cache to `path`: the signature and hrefs of each
+    file in `files`, and `ranks` for those of its pages it holds.
+
+    Hrefs are stored once each, in a string table, and each page's
+    links as int32 numbers into it. As in the Degrees snapshot, the
+    file is written under a temporary name and moved into place.
+    """
+    pages = list(files)
+    table = sorted(set().union(*hrefs.values()))
+    number = {href: i for i, href in enumerate(table)}
+    offsets, blob = _pack_strings(table)
+    link_offsets = array("q", [0])
+    targets = array("i")
+    for page in pages:
+        targets.extend(number[href] for href in hrefs[page])
+        link_offsets.append(len(targets))
+    rank_values = array("d", (ranks.get(page, 0.0) for page in pages)) if ranks else array("d")
+    sections = [
+        ("hrefs.offsets", "q", offsets),
+        ("hrefs.blob", "B", blob),
+        ("link_offsets", "q", link_offsets),
+        ("links", "i", targets),
+        ("ranks", "d", rank_values)
+    ]
+
+    # Lay sections out after the header, each aligned to 8 bytes
+    layout = {}
+    position = 0
+    for name, typecode, data in sections:
+        layout[name] = [position, len(data), typecode]
+        position += _padding(len(data) * data.itemsize)
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "files": [[page] + files[page] for page in pages],
+        "sections": layout
+    }).encode("utf-8")
+    start = _padding(len(MAGIC) + 4 + len(header))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(bytes(start - f.tell()))
+            for name, typecode, data in sections:
+                f.write(data)
+                f.write(bytes(start + _padding(f.tell() - start) - f.tell()))
+        os.replace(temporary, path)
+    except BaseException:
+        # Leave no partial file behind, e.g. when the disk is full
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def read_cache(path):
+    """
+    Returns (files, hrefs, ranks) as stored by write_cache, each a dict
+    by page. Raises ValueError if the file is not a cache of this
+    version or byte order.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        view = memoryview(data)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a pagerank cache")
+        (length,) = struct.unpack_from("<I", view, len(MAGIC))
+        header = json.loads(str(view[len(MAGIC) + 4:len(MAGIC) + 4 + length], "utf-8"))
+        if header["version"] != VERSION or header["byteorder"] != sys.byteorder:
+            raise ValueError("incompatible cache")
+        start = _padding(len(MAGIC) + 4 + length)
+
+        def section(name):
+            offset, count, typecode = header["sections"][name]
+            offset += start
+            size = count * array(typecode).itemsize
+            if offset + size > len(view):
+                raise ValueError("truncated cache")
+            return view[offset:offset + size].cast(typecode)
+
+        offsets, blob = section("hrefs.offsets"), section("hrefs.blob")
+        table = [str(blob[a:b], "utf-8") for a, b in zip(offsets, offsets[1:])]
+        link_offsets, targets = section("link_offsets").tolist(), section("links").tolist()
+        values = section("ranks").tolist()
+
+        files, hrefs = {}, {}
+        for i, (page, size, mtime) in enumerate(header["files"]):
+            files[page] = [size, mtime]
+            hrefs[page] = [table[j] for j in targets[link_offsets[i]:link_offsets[i + 1]]]
+        ranks = dict(zip(files, values))
+    except (KeyError, TypeError, IndexError, struct.error):
+        raise ValueError("corrupt cache")
+    return files, hrefs, ranks
+
+
+def _pack_strings(strings):
+    """
+    Packs strings into an int64 offsets array and a UTF-8 byte array.
+    """
+    offsets = array("q", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, array("B", blob)
+
+
+def _padding(size):
+    """
+    Rounds a byte count up to a multiple of 8.
+    """
+    return (size + 7) & ~7
+
+
+def main():
+    from pagerank import DAMPING
+
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python cache.py corpus [processes]")
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    start = time.perf_counter()
+    ranks, corpus, iterations = cached_pagerank(sys.argv[1], DAMPING, processes=processes)
+    seconds = time.perf_counter() - start
+    print(f"{len(ranks)} pages, {corpus.parsed} parsed, "
+          f"{iterations} iterations in {seconds:.2f}s")
+    if len(ranks) <= 20:
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
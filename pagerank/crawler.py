@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import re
+import sys
+import time
+from array import array
+
+from sparse import LinkMatrix
+
+# Bytes of HTML read and scanned at a time
+CHUNK_SIZE = 64 * 1024
+
+# An <a> tag, and the href attribute within one
+ANCHOR = re.compile(rb"<a\s[^>]*>", re.IGNORECASE)
+HREF = re.compile(rb"""\shref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))""", re.IGNORECASE)
+
+# Files handed to a worker at a time
+FILES_PER_TASK = 64
+
+# Page numbers by file name, set up once per worker by _init_worker
+_index = None
+
+
+def links(path):
+    """
+    Returns the hrefs of the <a> tags in an HTML file.
+
+    The file is read in chunks and scanned tag by tag, carrying a tag
+    cut off at the end of a chunk over to the next one, so a page never
+    has to be held in memory whole. Only the text of each <a> tag is
+    searched for its href, which may be quoted either way or not at
+    all. Only the hrefs are decoded from UTF-8.
+    """
+    result = []
+    tail = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            text = tail + chunk
+            for tag in ANCHOR.findall(text):
+                match = HREF.search(tag)
+                if match:
+                    result.append(match.group(match.lastindex).decode("utf-8", "replace"))
+            if not chunk:
+                return result
+            last = text.rfind(b"<")
+            tail = text[last:] if last > text.rfind(b">") else b""
+
+
+def crawl_edges(directory, processes=None):
+    """
+    Parses every .html file of a directory on a pool of processes.
+
+    Returns (pages, sources, targets): the sorted file names, and the
+    link graph as an edge list of two int arrays, where page
+    `sources[k]` links to page `targets[k]`. As in pagerank.crawl,
+    links leaving the corpus and links from a page to itself are
+    dropped, and each link is counted once per page.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    pages = sorted(name for name in os.listdir(directory) if name.endswith(".html"))
+    index = {page: i for i, page in enumerate(pages)}
+    paths = [os.path.join(directory, page) for page in pages]
+
+    if processes > 1 and len(pages) > FILES_PER_TASK:
+        with multiprocessing.Pool(processes, _init_worker, (index,)) as pool:
+            rows = list(pool.imap(_targets, enumerate(paths), FILES_PER_TASK))
+    else:
+        _init_worker(index)
+        rows = list(map(_targets, enumerate(paths)))
+
+    sources, targets = array("i"), array("i")
+    for source, row in enumerate(rows):
+        sources.extend([source] * len(row))
+        targets.extend(row)
+    return pages, sources, targets
+
+
+def crawl(directory, processes=None):
+    """
+    Returns the same dictionary as pagerank.crawl, of each page to the
+    set of corpus pages it links to, using crawl_edges.
+    """
+    pages, sources, targets = crawl_edges(directory, processes)
+    corpus = {page: set() for page in pages}
+    for source, target in zip(sources, targets):
+        corpus[pages[source]].add(pages[target])
+    return corpus
+
+
+def link_matrix(directory, processes=None):
+    """Crawls a directory straight into a LinkMatrix."""
+    pages, sources, targets = crawl_edges(directory, processes)
+    rows = [[] for page in pages]
+    for source, target in zip(sources, targets):
+        rows[source].append(target)
+    return LinkMatrix.from_links(pages, rows)
+
+
+def _init_worker(index):
+    global _index
+    _index = index
+
+
+def _targets(task):
+    """Returns the sorted page numbers one page links to."""
+    source, path = task
+    row = {_index.get(link) for link in links(path)}
+    row.discard(None)
+    row.discard(source)
+    return array("i", sorted(row))
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python crawler.py corpus [processes]")
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    start = time.perf_counter()
+    pages, sources, targets = crawl_edges(sys.argv[1], processes)
+    seconds = time.perf_counter() - start
+    print(f"{len(pages)} pages, {len(sources)} links in {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
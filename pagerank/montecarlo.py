@@ -0,0 +1,129 @@
+import argparse
+import hashlib
+import math
+import multiprocessing
+import operator
+import os
+from statistics import NormalDist
+
+from sparse import LinkMatrix
+
+# Independent walks the samples are split into. Fixed, rather than one
+# per process, so that the result for a seed does not depend on how
+# many processes ran it.
+CHUNKS = 32
+
+# Per-worker state, set up once by _init_worker
+_matrix = None
+_damping = None
+
+
+def sample_pagerank(matrix, damping_factor, n, seed=None, processes=None,
+                    chunks=CHUNKS, confidence=0.95):
+    """
+    Estimates PageRank from `n` random surfer steps split into `chunks`
+    independent walks, run on a pool of processes.
+
+    Each walk has its own random stream, derived from `seed` and the
+    walk's number, and the visit counts of all walks are added up, so
+    the same seed gives the same ranks for any number of processes.
+    Without a seed, one is drawn from os.urandom.
+
+    Returns (ranks, intervals), two dicts keyed by page: the estimated
+    rank, and the half-width of its `confidence` interval. Intervals
+    come from batch means: the spread of the walks' own estimates
+    around their average, whose standard error shrinks as 1/sqrt(n),
+    with a normal approximation for the quantile. With no steps to
+    take, every rank is 0 and every interval infinite.
+    """
+    if n <= 0:
+        return dict.fromkeys(matrix.pages, 0.0), dict.fromkeys(matrix.pages, math.inf)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), "big")
+    chunks = max(1, min(chunks, n))
+    tasks = [
+        (n // chunks + (i < n % chunks), chunk_seed(seed, i))
+        for i in range(chunks)
+    ]
+
+    size = len(matrix.pages)
+    totals = [0] * size
+    shares = [0.0] * size
+    squares = [0.0] * size
+
+    def merge(results):
+        nonlocal totals, shares, squares
+        for (steps, _), counts in zip(tasks, results):
+            counts = counts.tolist()
+            share = [count / steps for count in counts]
+            totals = list(map(operator.add, totals, counts))
+            shares = list(map(operator.add, shares, share))
+            squares = list(map(operator.add, squares, map(operator.mul, share, share)))
+
+    if processes == 1:
+        _init_worker(matrix, damping_factor)
+        merge(map(_visits, tasks))
+    else:
+        with multiprocessing.Pool(processes, _init_worker, (matrix, damping_factor)) as pool:
+            merge(pool.imap(_visits, tasks))
+
+    ranks = {page: total / n for page, total in zip(matrix.pages, totals)}
+    intervals = {}
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    for page, total, square in zip(matrix.pages, shares, squares):
+        if chunks < 2:
+            intervals[page] = math.inf
+            continue
+        mean = total / chunks
+        variance = max(0.0, (square - chunks * mean * mean) / (chunks - 1))
+        intervals[page] = z * math.sqrt(variance / chunks)
+    return ranks, intervals
+
+
+def chunk_seed(seed, chunk):
+    """
+    Returns the seed of one walk's random stream, mixed from the run's
+    seed and the walk's number so that streams do not overlap.
+    """
+    digest = hashlib.sha256(f"{seed}:{chunk}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _init_worker(matrix, damping_factor):
+    global _matrix, _damping
+    _matrix = matrix
+    _damping = damping_factor
+
+
+def _visits(task):
+    steps, seed = task
+    return _matrix.visits(_damping, steps, seed)
+
+
+def main():
+    from pagerank import DAMPING, crawl
+
+    parser = argparse.ArgumentParser(
+        description="Estimate PageRank by parallel random surfer sampling."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("-n", "--samples", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    args = parser.parse_args()
+
+    matrix = LinkMatrix.from_corpus(crawl(args.corpus))
+    ranks, intervals = sample_pagerank(
+        matrix, DAMPING, args.samples, args.seed, args.processes,
+        confidence=args.confidence
+    )
+    print(f"PageRank Results from Sampling (n = {args.samples}, seed = {args.seed})")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f} ± {intervals[page]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ import random
 import re
 import sys
 
+import montecarlo
+from sparse import TOLERANCE, LinkMatrix
+
 DAMPING = 0.85
 SAMPLES = 10000
 
@@ -80,7 +83,7 @@ def transition_model(corpus, page, damping_factor):
     return my_dict
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, seed=None, processes=1, intervals=False):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -88,41 +91,32 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
-    """
-
-
-    sample = []
-    my_dict = {}
-    for times in range(n):
-        if times == 0:
-            random_page = random.choice(list(corpus.keys()))
-            sample_transition = transition_model(corpus=corpus,page=random_page,damping_factor=damping_factor)
-        while True:
-            random_num = random.random()
-            key = random.choice(list(sample_transition.keys()))
-            if sample_transition[key] > random_num:
-                sample_transition = transition_model(corpus=corpus,page=key,damping_factor=damping_factor)
-                sample.append(key)
-                break
-    for key in set(sample):
-        my_dict[key] = sample.count(key) / n
 
-    return my_dict
+    Pages are numbered and their links kept in flat arrays (see
+    sparse.py), so each step is a couple of random draws and array
+    lookups rather than a new transition_model dict. The samples are
+    split into seeded walks, run in parallel with more than one
+    process (see montecarlo.py), so a seed gives the same ranks for
+    any number of processes. With `intervals`, return (ranks,
+    intervals) instead, where intervals holds the half-width of each
+    rank's 95% confidence interval.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, half_widths = montecarlo.sample_pagerank(matrix, damping_factor, n, seed, processes)
+    if intervals:
+        return ranks, half_widths
+    return ranks
 
 
 def num_links(corpus):
-    corpus_dict = corpus
-    links = {}
-    for key in corpus_dict.keys():
-        links[key] = []
-    for key in corpus_dict.keys():
-        for page in corpus_dict.keys():
-            if key in corpus_dict[page]:
-                links[key].append(page)
-    return links
+    """
+    Return a dictionary mapping each page to the list of pages that
+    link to it (see LinkMatrix.incoming).
+    """
+    return LinkMatrix.from_corpus(corpus).incoming()
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -130,20 +124,13 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
-    """
-    corpus_dict = corpus
-    my_dict = {}
-    linked_pages = num_links(corpus)
-    for key in corpus_dict.keys():
-        my_dict[key] = (1 - damping_factor) / len(corpus_dict)
-    for i in range(100):
-        for linked in linked_pages:
-            sum_rank = 0
-            for page in linked_pages[linked]:
-                sum_rank +=  damping_factor * (my_dict[page] / len(corpus_dict[page]))
-            my_dict[linked] = sum_rank + (1 - damping_factor) / len(corpus_dict)
 
-    return my_dict
+    The corpus is turned into a sparse link matrix once (see sparse.py)
+    and power iteration runs until the ranks change by less than
+    `tolerance` in total. Pages without links are treated as linking to
+    every page, so their rank is spread evenly instead of lost.
+    """
+    return LinkMatrix.from_corpus(corpus).pagerank(damping_factor, tolerance)
 
 
 
@@ -0,0 +1,259 @@
+import operator
+import random
+from array import array
+from itertools import accumulate, chain
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Stop once the ranks change by less than this in total (L1 norm)
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 1000
+
+# Most walkers advanced together by the NumPy sampler
+WALKERS = 100_000
+
+# Unrecorded steps each walker takes first, so that where it started
+# no longer matters (the start's influence decays as damping ** steps)
+BURN_IN = 50
+
+
+class LinkMatrix():
+    """
+    Links of a corpus as a sparse matrix in compressed sparse row form.
+
+    Pages are numbered by their position in `pages`. Row i lists the
+    pages linking to page i: they are `sources[offsets[i]:offsets[i + 1]]`.
+    The transpose is kept too, for walking links forwards: page j links
+    to `links[link_offsets[j]:link_offsets[j + 1]]`. `out_degree[j]` is
+    the number of links on page j, and pages with no links are
+    "dangling".
+    """
+
+    def __init__(self, pages, offsets, sources, link_offsets, links):
+        self.pages = pages
+        self.offsets = offsets
+        self.sources = sources
+        self.link_offsets = link_offsets
+        self.links = links
+        self.out_degree = array("i", map(operator.sub, link_offsets[1:], link_offsets[:-1]))
+        self.iterations = 0
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds the matrix from a dict of pages to the set of pages they
+        link to, ignoring links to pages outside the corpus.
+        """
+        pages = list(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        targets = [
+            sorted(index[link] for link in corpus[page] if link in index)
+            for page in pages
+        ]
+        return cls.from_links(pages, targets)
+
+    @classmethod
+    def from_links(cls, pages, targets):
+        """
+        Builds the matrix from a list of each page's outgoing links, as
+        page numbers.
+        """
+        n = len(pages)
+        links = array("i", chain.from_iterable(targets))
+        link_offsets = array("q", accumulate(map(len, targets), initial=0))
+        if numpy is not None:
+            return cls._from_links_numpy(pages, links, link_offsets)
+
+        # Count incoming links, then fill each row in one pass
+        offsets = array("q", bytes(8 * (n + 1)))
+        for row in targets:
+            for target in row:
+                offsets[target + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        sources = array("i", bytes(4 * offsets[n]))
+        fill = offsets[:n]
+        for source, row in enumerate(targets):
+            for target in row:
+                sources[fill[target]] = source
+                fill[target] += 1
+        return cls(pages, offsets, sources, link_offsets, links)
+
+    @classmethod
+    def _from_links_numpy(cls, pages, links, link_offsets):
+        n = len(pages)
+        target = numpy.frombuffer(links, dtype=numpy.int32)
+        degree = numpy.diff(numpy.frombuffer(link_offsets, dtype=numpy.int64))
+        source = numpy.repeat(numpy.arange(n, dtype=numpy.int32), degree)
+
+        # A stable sort by target keeps each row's sources in order
+        order = numpy.argsort(target, kind="stable")
+        counts = numpy.bincount(target, minlength=n)
+        offsets = array("q", bytes(8))
+        offsets.frombytes(numpy.cumsum(counts, dtype=numpy.int64).tobytes())
+        sources = array("i")
+        sources.frombytes(source[order].tobytes())
+        return cls(pages, offsets, sources, link_offsets, links)
+
+    def incoming(self):
+        """Returns a dict of each page to the list of pages linking to it."""
+        return {
+            page: [self.pages[j] for j in self.sources[self.offsets[i]:self.offsets[i + 1]]]
+            for i, page in enumerate(self.pages)
+        }
+
+    def pagerank(self, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                 start=None):
+        """
+        Returns the PageRank of every page as a dict, by power iteration.
+
+        Each step gives every page (1 - d) / N, plus d times the rank
+        flowing in over its links, plus an equal share of d times the
+        rank of the dangling pages, which are treated as linking to
+        every page. Iteration stops when the ranks change by less than
+        `tolerance` in total.
+
+        Iteration starts from uniform ranks, or from `start`, a dict of
+        ranks by page such as an earlier result: pages missing from it
+        get 1 / N, and the whole is rescaled to sum to 1. The number of
+        steps taken is kept in `iterations`.
+        """
+        initial = self._initial(start)
+        if numpy is not None:
+            ranks = self._iterate_numpy(damping_factor, tolerance, max_iterations, initial)
+        else:
+            ranks = self._iterate(damping_factor, tolerance, max_iterations, initial)
+        return dict(zip(self.pages, map(float, ranks)))
+
+    def _initial(self, start):
+        """Returns the starting ranks for pagerank, as a list."""
+        n = len(self.pages)
+        if not n:
+            return []
+        if not start:
+            return [1 / n] * n
+        ranks = [max(0.0, start.get(page, 1 / n)) for page in self.pages]
+        total = sum(ranks)
+        if not total:
+            return [1 / n] * n
+        return [rank / total for rank in ranks]
+
+    def _iterate(self, damping, tolerance, max_iterations, ranks):
+        n = len(self.pages)
+        self.iterations = 0
+        if not n:
+            return []
+        share = [1 / degree if degree else 0.0 for degree in self.out_degree]
+        dangling = [j for j, degree in enumerate(self.out_degree) if not degree]
+        for self.iterations in range(1, max_iterations + 1):
+            flow = list(map(operator.mul, ranks, share))
+            base = (1 - damping) / n + damping * sum(map(ranks.__getitem__, dangling)) / n
+
+            # Sum each row as the difference of running totals over all
+            # links at its offsets, which keeps the loops out of Python
+            totals = list(accumulate(map(flow.__getitem__, self.sources), initial=0.0))
+            totals = list(map(totals.__getitem__, self.offsets))
+            new = [base + damping * (b - a) for a, b in zip(totals, totals[1:])]
+            change = sum(map(abs, map(operator.sub, new, ranks)))
+            ranks = new
+            if change < tolerance:
+                break
+        return ranks
+
+    def _iterate_numpy(self, damping, tolerance, max_iterations, initial):
+        n = len(self.pages)
+        self.iterations = 0
+        if not n:
+            return []
+        offsets = numpy.frombuffer(self.offsets, dtype=numpy.int64)
+        sources = numpy.frombuffer(self.sources, dtype=numpy.int32)
+        targets = numpy.repeat(numpy.arange(n), numpy.diff(offsets))
+        degree = numpy.frombuffer(self.out_degree, dtype=numpy.int32).astype(float)
+        dangling = degree == 0
+        share = numpy.divide(1.0, degree, out=numpy.zeros(n), where=~dangling)
+        ranks = numpy.array(initial)
+        for self.iterations in range(1, max_iterations + 1):
+            flow = (ranks * share)[sources]
+            base = (1 - damping) / n + damping * ranks[dangling].sum() / n
+            new = base + damping * numpy.bincount(targets, weights=flow, minlength=n)
+            change = numpy.abs(new - ranks).sum()
+            ranks = new
+            if change < tolerance:
+                break
+        return ranks
+
+    def sample(self, damping_factor, n, seed=None):
+        """
+        Returns PageRank estimates as a dict: the share of `n` random
+        surfer steps that land on each page.
+        """
+        if n <= 0:
+            return {page: 0.0 for page in self.pages}
+        counts = self.visits(damping_factor, n, seed)
+        return {page: count / n for page, count in zip(self.pages, map(int, counts))}
+
+    def visits(self, damping_factor, n, seed=None):
+        """
+        Takes `n` random surfer steps and returns how often each page
+        was visited, by page number.
+
+        At each step the surfer follows one of the current page's links,
+        picked uniformly, with probability `damping_factor`, and
+        otherwise (or from a page without links) jumps to a page picked
+        uniformly from all pages. Walks start from random pages and are
+        only recorded after BURN_IN steps. The same seed gives the same
+        counts, and `n` of 0 or less gives no visits.
+        """
+        if n <= 0:
+            return array("q", bytes(8 * len(self.pages)))
+        if numpy is not None:
+            return self._visits_numpy(damping_factor, n, seed)
+        return self._visits(damping_factor, n, seed)
+
+    def _visits(self, damping, n, seed):
+        size = len(self.pages)
+        rand = random.Random(seed).random
+        degree, offsets, links = self.out_degree, self.link_offsets, self.links
+        counts = array("q", bytes(8 * size))
+        page = int(rand() * size)
+        for step in range(BURN_IN + n):
+            if rand() < damping and degree[page]:
+                page = links[offsets[page] + int(rand() * degree[page])]
+            else:
+                page = int(rand() * size)
+            if step >= BURN_IN:
+                counts[page] += 1
+        return counts
+
+    def _visits_numpy(self, damping, n, seed):
+        size = len(self.pages)
+        rng = numpy.random.default_rng(seed)
+        degree = numpy.frombuffer(self.out_degree, dtype=numpy.int32)
+        offsets = numpy.frombuffer(self.link_offsets, dtype=numpy.int64)
+        links = numpy.frombuffer(self.links, dtype=numpy.int32)
+        counts = numpy.zeros(size, dtype=numpy.int64)
+
+        # Advance a batch of independent walkers one step at a time,
+        # with few enough walkers that burning them in costs at most n
+        pages = rng.integers(size, size=max(1, min(WALKERS, n // BURN_IN)))
+        for _ in range(BURN_IN):
+            pages = self._step(pages, damping, rng, degree, offsets, links)
+        remaining = n
+        while remaining:
+            pages = self._step(pages[:remaining], damping, rng, degree, offsets, links)
+            counts += numpy.bincount(pages, minlength=size)
+            remaining -= len(pages)
+        return counts
+
+    def _step(self, pages, damping, rng, degree, offsets, links):
+        """Moves each NumPy walker in `pages` one step."""
+        jumps = rng.integers(len(self.pages), size=len(pages))
+        if not len(links):
+            return jumps
+        degrees = degree[pages]
+        follow = (rng.random(len(pages)) < damping) & (degrees > 0)
+        picks = offsets[pages] + (rng.random(len(pages)) * degrees).astype(numpy.int64)
+        return numpy.where(follow, links[numpy.where(follow, picks, 0)], jumps)